@@ -0,0 +1,177 @@
+import asyncio
+
+from app.infrastructure.state_manager import state_manager, format_history, HISTORY_WINDOW
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token: close enough to compare prompt strategies
+    return (len(text) + 3) // 4 if text else 0
+
+
+def cart_facts(context: dict, state: str) -> dict:
+    """Structured cart facts from the session context (deterministic, no LLM)."""
+    delivery = context.get("delivery_info") or {}
+    modifiers = context.get("modifiers") or {}
+    return {
+        "state": state,
+        "items": [f"{i.get('quantity', 1)}x {i.get('product')}" for i in context.get("items", []) if i.get("product")],
+        "modifiers": {k: v for k, v in modifiers.items() if v},
+        "delivery_method": delivery.get("method"),
+        "address": delivery.get("address"),
+    }
+
+
+def render_facts(facts: dict) -> str:
+    parts = []
+    if facts.get("items"):
+        parts.append("Carrito (ya anotado): " + ", ".join(facts["items"]))
+    for key, value in (facts.get("modifiers") or {}).items():
+        parts.append(f"{key}: {value}")
+    if facts.get("delivery_method"):
+        parts.append(f"Entrega: {facts['delivery_method']}")
+    if facts.get("address"):
+        parts.append(f"Dirección: {facts['address']}")
+    return "\n".join(parts)
+
+
+class ConversationMemory:
+    """
+    Bounded prompt history: a rolling summary + cart facts + the last few raw messages.
+
+    Prompts carry exactly the last `recent` raw messages. Older ones are folded into
+    the summary eagerly, after every turn, in the background (low-priority LLM call),
+    so prompts stop growing and nothing is forgotten when the 6-message Redis window
+    rolls over. A fold that hasn't landed yet (or is shed under load) only costs
+    those messages until the next one; the cart facts keep the order itself.
+    Token estimates for both strategies are accumulated so they can be compared.
+    """
+
+    def __init__(self, enabled: bool, recent_messages: int, summarizer=None):
+        self.enabled = enabled
+        # Older messages must still be in the raw window when the fold runs
+        self.recent = max(0, min(recent_messages, HISTORY_WINDOW - 2))
+        self.summarizer = summarizer  # async (summary, messages_text, tenant) -> str | None
+        self._tasks = {}     # session key -> background update in flight
+        self._dirty = set()  # Sessions with turns newer than their in-flight update
+        self.stats = {
+            "prompts": 0,
+            "compact_tokens": 0,     # What prompts carried with this strategy
+            "raw_window_tokens": 0,  # What the raw 6-message window would have carried
+            "summary_calls": 0,
+            "summary_tokens": 0,     # Input + output of the summary calls (the cost side)
+            "summary_errors": 0,
+        }
+
+    # --- Prompt side (turn path) ---
+
+    def prompt_history(self, sid: str) -> str:
+        messages, total = state_manager.get_history_window(sid)
+        raw = format_history(messages)
+        if not self.enabled:
+            self._count(raw, raw)
+            return raw
+
+        memory = state_manager.get_memory(sid)
+        first_index = total - len(messages)  # Global index of messages[0]
+        folded = max(memory.get("folded", 0), first_index)
+        # Last `recent` messages, never from before a session reset
+        tail = messages[max(folded - first_index, len(messages) - self.recent):]
+
+        blocks = []
+        if memory.get("summary"):
+            blocks.append(f"RESUMEN: {memory['summary']}")
+        facts = render_facts(memory.get("facts") or {})
+        if facts:
+            blocks.append(facts)
+        if tail:
+            blocks.append(format_history(tail))
+        compact = "\n".join(blocks)
+        self._count(compact, raw)
+        return compact
+
+    def _count(self, compact: str, raw: str):
+        self.stats["prompts"] += 1
+        self.stats["compact_tokens"] += estimate_tokens(compact)
+        self.stats["raw_window_tokens"] += estimate_tokens(raw)
+
+    # --- Update side (background, after the turn) ---
+
+    def reset(self, sid: str):
+        """
+        Session reset (order cancelled / confirmed): the history window stays, so the
+        memory restarts after it and nothing said before gets summarized again. The
+        epoch bump tells an update still running for the old session to drop its result.
+        """
+        if not self.enabled:
+            return
+        _, total = state_manager.get_history_window(sid)
+        epoch = state_manager.get_memory(sid).get("epoch", 0) + 1
+        state_manager.set_memory(sid, {"folded": total, "epoch": epoch})
+        self._dirty.discard(sid)
+
+    def after_turn(self, sid: str, tenant=None):
+        """Schedules the facts/summary update; never adds latency to the reply."""
+        if not self.enabled:
+            return
+        if sid in self._tasks:
+            self._dirty.add(sid)  # The running update reruns for this turn when it finishes
+            return
+        task = asyncio.create_task(self._run(sid, tenant))
+        self._tasks[sid] = task
+        task.add_done_callback(lambda _: self._tasks.pop(sid, None))
+
+    async def _run(self, sid: str, tenant):
+        while True:
+            self._dirty.discard(sid)
+            await self._update(sid, tenant)
+            if sid not in self._dirty:
+                return
+
+    async def _update(self, sid: str, tenant):
+        memory = state_manager.get_memory(sid)
+        epoch = memory.get("epoch", 0)
+        messages, total = state_manager.get_history_window(sid)
+        first_index = total - len(messages)
+        folded = max(memory.get("folded", 0), first_index)
+        foldable = total - self.recent - folded  # Left the recent window, not summarized yet
+
+        if foldable > 0 and self.summarizer:
+            batch = messages[folded - first_index:folded - first_index + foldable]
+            text = format_history(batch)
+            try:
+                summary = await self.summarizer(memory.get("summary", ""), text, tenant)
+            except Exception as e:
+                print(f"❌ ConversationMemory Error: {e}")
+                self.stats["summary_errors"] += 1
+                summary = None
+            if summary:
+                self.stats["summary_calls"] += 1
+                self.stats["summary_tokens"] += estimate_tokens(memory.get("summary", "") + text + summary)
+                memory["summary"] = summary
+                memory["folded"] = folded + foldable
+
+        if state_manager.get_memory(sid).get("epoch", 0) != epoch:
+            return  # Session was reset while summarizing: this summary belongs to the old order
+
+        # Read after the summary call: the cart may have changed while it ran
+        memory["facts"] = cart_facts(state_manager.get_context(sid), state_manager.get_state(sid))
+        state_manager.set_memory(sid, memory)
+
+    async def drain(self):
+        """Waits for background updates (evaluation / tests)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        s = self.stats
+        prompts = s["prompts"] or 1
+        compact_total = s["compact_tokens"] + s["summary_tokens"]
+        return {
+            "enabled": self.enabled,
+            "recent_messages": self.recent,
+            "avg_prompt_history_tokens": round(s["compact_tokens"] / prompts, 1),
+            "avg_raw_window_tokens": round(s["raw_window_tokens"] / prompts, 1),
+            "summary_tokens_per_prompt": round(s["summary_tokens"] / prompts, 1),
+            "net_tokens_saved": s["raw_window_tokens"] - compact_total,
+            **s,
+        }
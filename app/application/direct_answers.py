@@ -0,0 +1,250 @@
+import math
+import os
+import re
+import time
+
+from app.domain.menu_catalog import MENU_DB, MenuCatalog, parse_menu_markdown, merge_availability
+from app.domain.tenant import Tenant, DEFAULT_TENANT_ID
+from app.infrastructure.rule_engine import normalize
+
+KIND_PRICE = "price"
+KIND_AVAILABILITY = "availability"
+KIND_HOURS = "hours"
+
+_STOPWORDS = {"de", "del", "con", "la", "el", "los", "las", "y", "al", "en", "a", "un", "una", "para", "por",
+              "que", "cuanto", "cuesta", "precio", "tienen", "hay", "esta", "estan", "me", "le", "su", "mi"}
+_PEOPLE = re.compile(r"(\d+)\s*(?:personas|porciones|pax|invitados|gente)|para\s+(\d+)")
+
+
+def _stem(token: str) -> str:
+    # "alfajores" / "alfajor", "tortas" / "torta"
+    if len(token) > 4 and token.endswith("es"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s"):
+        return token[:-1]
+    return token
+
+
+def _ordered_tokens(text: str) -> list:
+    return [_stem(t) for t in normalize(text).split() if t not in _STOPWORDS and not t.isdigit()]
+
+
+def _tokens(text: str) -> set:
+    return set(_ordered_tokens(text))
+
+
+def _words(*words: str) -> set:
+    return {_stem(t) for t in normalize(" ".join(words)).split()}
+
+
+# A template only answers the question it was made for: every word besides the product
+# must be one of these (or filler). "¿el cheesecake tiene gluten?" goes to the LLM.
+_FILLER = _words("hola", "buenas", "buenos", "dias", "tardes", "noches", "veci", "vecina", "vecino",
+                 "porfa", "favor", "gracias", "ustedes", "usted", "si", "ok", "bueno", "es", "son", "seria")
+_QUESTION_WORDS = {
+    KIND_PRICE: _words("cuanto", "cuanta", "cuesta", "cuestan", "vale", "valen", "precio", "precios",
+                       "costo", "valor", "sale", "salen", "cobran", "personas", "porciones", "pax",
+                       "invitados", "gente", "tamano", "tamanos", "unidad", "unidades", "cada", "uno"),
+    KIND_AVAILABILITY: _words("tienen", "tiene", "tendran", "hay", "habra", "disponible", "disponibles",
+                              "queda", "quedan", "todavia", "aun", "hoy", "ahora", "venden", "vende",
+                              "alguna", "alguno"),
+}
+
+
+class _CatalogIndex:
+    """Parsed catalog + token index (IDF-weighted) for product resolution."""
+
+    def __init__(self, catalog: MenuCatalog):
+        self.catalog = catalog
+        self.product_tokens = [(p, _tokens(p.name)) for p in catalog.products]
+        self.flavor_tokens = [_tokens(f) for f in catalog.flavors]  # Bases / fillings compete too
+        # First word of the name ("alfajor", "torta"): the kind of product
+        self.heads = {p.name: next(iter(_ordered_tokens(p.name)), "") for p in catalog.products}
+        self.df = {}
+        for _, tokens in self.product_tokens:
+            for t in tokens:
+                self.df[t] = self.df.get(t, 0) + 1
+        n = max(len(self.product_tokens), 1)
+        self.idf = {t: math.log(1 + n / df) for t, df in self.df.items()}
+
+
+class DirectAnswerEngine:
+    """
+    Answers price / availability / hours questions from the menu parsed into a
+    product -> portion -> price table (plus MENU_DB availability) with templates:
+    no LLM call, no misquoted portion prices. Anything not resolved confidently
+    returns "" and falls through to the LLM.
+    """
+
+    def __init__(self, min_margin: float = 0.75):
+        self.min_margin = min_margin  # Runner-up must score below min_margin x best
+        self._indexes = {}            # menu_path -> (mtime, _CatalogIndex)
+        self.stats = {
+            "attempts": 0,
+            "hits": {KIND_PRICE: 0, KIND_AVAILABILITY: 0, KIND_HOURS: 0},
+            "misses": 0,
+            "llm_calls_saved": 0,
+            "answer_ms_total": 0.0,
+            "llm_response_ms_total": 0.0,
+            "llm_responses": 0,
+        }
+
+    # --- Catalog ---
+
+    def _index(self, tenant: Tenant) -> _CatalogIndex | None:
+        path = tenant.menu_path
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        cached = self._indexes.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, encoding="utf-8") as f:
+            catalog = parse_menu_markdown(f.read())
+        if tenant.id == DEFAULT_TENANT_ID:
+            catalog = merge_availability(catalog, MENU_DB)
+        index = _CatalogIndex(catalog)
+        self._indexes[path] = (mtime, index)
+        print(f"✅ DirectAnswerEngine: {len(catalog.products)} products parsed from {path}")
+        return index
+
+    def _is_active(self, tenant: Tenant, product) -> bool:
+        if tenant.id == DEFAULT_TENANT_ID:
+            for entry in MENU_DB:  # Live toggle from /admin/menu
+                if entry["name"].lower() == product.name.lower():
+                    return entry["is_active"]
+        return product.is_active
+
+    def resolve_product(self, index: _CatalogIndex, text: str):
+        """
+        Best product if it wins clearly and matched a distinctive word (or its full name).
+        A distinctive head word must be named too: "chocolate blanco" is not "Alfajores
+        de chocolate negro y blanco", while "la mocca" is still "Torta Mocca".
+        Unless the full name was given, no other menu entry may match the same words:
+        "maracuyá" is a mousse and a cake base, "caracoles" two bocaditos (LLM asks).
+        """
+        query = _tokens(text)
+        scored = []
+        for product, tokens in index.product_tokens:
+            matched = query & tokens
+            if matched:
+                score = sum(index.idf[t] for t in matched)
+                head = index.heads[product.name]
+                distinctive = matched == tokens or any(index.df[t] <= 2 for t in matched)
+                distinctive = distinctive and (head in matched or index.df.get(head, 0) > 2)
+                scored.append((score, distinctive, matched, product))
+        if not scored:
+            return None
+
+        scored.sort(key=lambda s: s[0], reverse=True)
+        best_score, distinctive, best_matched, best = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if not distinctive or runner_up >= best_score * self.min_margin:
+            return None
+        if best_matched != _tokens(best.name):
+            others = [matched for _, _, matched, _ in scored[1:]] + [query & t for t in index.flavor_tokens]
+            if any(best_matched <= matched for matched in others):
+                return None  # Ambiguous
+        return best
+
+    # --- Answers ---
+
+    def answer(self, kind: str, text: str, tenant: Tenant) -> str:
+        start = time.perf_counter()
+        self.stats["attempts"] += 1
+        reply = ""
+
+        index = self._index(tenant)
+        if index:
+            if kind == KIND_HOURS:
+                reply = self._hours_reply(index.catalog)
+            else:
+                product = self.resolve_product(index, text)
+                if product and not self._only_asks(kind, text, product):
+                    product = None
+                if product and kind == KIND_PRICE:
+                    reply = self._price_reply(tenant, product, text)
+                elif product and kind == KIND_AVAILABILITY:
+                    reply = self._availability_reply(tenant, product)
+
+        if reply:
+            self.stats["hits"][kind] += 1
+            self.stats["answer_ms_total"] += (time.perf_counter() - start) * 1000
+        else:
+            self.stats["misses"] += 1
+        return reply
+
+    def _only_asks(self, kind: str, text: str, product) -> bool:
+        """True if the message is just the product plus words of this question kind."""
+        extra = _tokens(text) - _tokens(product.name)
+        return extra <= (_QUESTION_WORDS[kind] | _FILLER)
+
+    def _hours_reply(self, catalog: MenuCatalog) -> str:
+        if not catalog.branches:
+            return ""
+        lines = ["Con gusto veci 😊 Nuestros horarios:"]
+        for branch in catalog.branches:
+            where = f"{branch.name}, {branch.address}" if branch.address else branch.name
+            lines.append(f"• {where}: {'; '.join(branch.schedule)}")
+        return "\n".join(lines)
+
+    def _price_reply(self, tenant: Tenant, product, text: str) -> str:
+        if not self._is_active(tenant, product):
+            return f"Hoy no tenemos {product.name} disponible 😔. ¿Le gustaría ver otra opción?"
+
+        if product.portions:
+            people = _PEOPLE.search(normalize(text))
+            if people:
+                n = int(people.group(1) or people.group(2))
+                fit = next((p for p in product.portions if p.min_people <= n <= p.max_people), None)
+                fit = fit or next((p for p in product.portions if p.max_people >= n), None)
+                if fit:
+                    return (f"Para {n} personas le recomiendo la {product.name} de {fit.label}: "
+                            f"${fit.price:.2f} 😊\n¿Desea hacer su pedido?")
+            lines = [f"La {product.name} está así 😊"]
+            lines += [f"• {p.label}: ${p.price:.2f}" for p in product.portions]
+            lines.append("¿Para cuántas personas sería?")
+            return "\n".join(lines)
+
+        if product.price_note:
+            return f"{product.name} ({product.category}): {product.price_note} 😊\n¿Cuántos le gustaría?"
+
+        if product.price is not None:
+            return f"{product.name}: ${product.price:.2f} 😊\n¿Desea hacer un pedido?"
+
+        return ""  # Known product without a price (e.g. specialties): let the LLM handle it
+
+    def _availability_reply(self, tenant: Tenant, product) -> str:
+        if product.stock_tracked:  # Live availability from /admin/menu
+            if self._is_active(tenant, product):
+                return f"Sí, tenemos {product.name} disponible 😊\n¿Cuántas le gustaría y para cuándo?"
+            return f"Hoy no tenemos {product.name} disponible 😔. ¿Le gustaría ver otra opción?"
+        if product.order_note:  # Made to order: the lead time is the answer
+            return f"Sí, preparamos {product.name} 😊 {product.order_note}\n¿Para qué fecha lo necesita?"
+        return ""  # No stock data (e.g. specialties): let the LLM answer
+
+    # --- Reporting ---
+
+    def record_llm_response(self, latency_ms: float):
+        """Latency of generate_response calls that could NOT be answered directly (baseline)."""
+        self.stats["llm_response_ms_total"] += latency_ms
+        self.stats["llm_responses"] += 1
+
+    def snapshot(self) -> dict:
+        s = self.stats
+        hits = sum(s["hits"].values())
+        avg_answer = s["answer_ms_total"] / hits if hits else 0.0
+        avg_llm = s["llm_response_ms_total"] / s["llm_responses"] if s["llm_responses"] else 0.0
+        return {
+            "attempts": s["attempts"],
+            "hits": s["hits"],
+            "misses": s["misses"],
+            "hit_rate": round(hits / s["attempts"], 3) if s["attempts"] else 0.0,
+            "llm_calls_saved": s["llm_calls_saved"],
+            "avg_direct_answer_ms": round(avg_answer, 2),
+            "avg_llm_response_ms": round(avg_llm, 1),
+            "est_latency_saved_ms": round(hits * max(avg_llm - avg_answer, 0.0), 1),
+        }
@@ -0,0 +1,118 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Conversation stages, most urgent first (priority numbers come from settings)
+STAGE_CHECKOUT = "checkout"   # STATE_CONFIRMING: customer is about to pay
+STAGE_ORDERING = "ordering"   # STATE_ORDERING or a fresh order_intent
+STAGE_MENU = "menu"           # Menu / price / availability questions (and unclassified messages)
+STAGE_GREETING = "greeting"   # Greetings, closings, small talk
+STAGE_BACKGROUND = "background"  # Work nobody is waiting for (conversation summaries)
+
+
+class _Waiter:
+    __slots__ = ("stage", "priority", "enqueued", "seq", "future")
+
+    def __init__(self, stage, priority, seq, future):
+        self.stage = stage
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.seq = seq
+        self.future = future
+
+
+class PriorityLLMScheduler:
+    """
+    Limits concurrent LLM calls and hands free slots to the most urgent waiter.
+    Waiters age: every `aging_seconds` spent in the queue improves their priority
+    by one level, so greetings are delayed under load but never starved.
+    """
+
+    def __init__(self, max_concurrency: int, aging_seconds: float, priorities: dict):
+        self.max_concurrency = max_concurrency
+        self.aging_seconds = aging_seconds
+        self.priorities = priorities
+        self._lowest = max(priorities.values(), default=0)
+
+        self._running = 0
+        self._waiting = []
+        self._seq = itertools.count()
+
+        self._wait_stats = {}  # stage -> {"count", "total", "max", "recent"}
+
+    def _effective_priority(self, waiter: _Waiter, now: float):
+        aged = (now - waiter.enqueued) / self.aging_seconds if self.aging_seconds else 0
+        return (waiter.priority - aged, waiter.seq)
+
+    @asynccontextmanager
+    async def slot(self, stage: str):
+        """Hold one LLM slot for the duration of the call."""
+        start = time.monotonic()
+
+        if self._running < self.max_concurrency and not self._waiting:
+            self._running += 1
+        else:
+            priority = self.priorities.get(stage, self._lowest)
+            waiter = _Waiter(stage, priority, next(self._seq), asyncio.get_running_loop().create_future())
+            self._waiting.append(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                elif waiter.future.done() and not waiter.future.cancelled():
+                    # Slot was handed over just before cancellation: pass it on
+                    self._release()
+                raise
+
+        self._record_wait(stage, time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self):
+        now = time.monotonic()
+        while self._waiting:
+            best = min(self._waiting, key=lambda w: self._effective_priority(w, now))
+            self._waiting.remove(best)
+            if best.future.done():
+                continue  # Cancelled, but its task hasn't run the except yet: skip it
+            best.future.set_result(None)  # Slot transfers directly, _running unchanged
+            return
+        self._running -= 1
+
+    def _record_wait(self, stage: str, wait: float):
+        stats = self._wait_stats.setdefault(stage, {"count": 0, "total": 0.0, "max": 0.0, "recent": deque(maxlen=500)})
+        stats["count"] += 1
+        stats["total"] += wait
+        stats["max"] = max(stats["max"], wait)
+        stats["recent"].append(wait)
+
+    def snapshot(self) -> dict:
+        queued = {}
+        for w in self._waiting:
+            queued[w.stage] = queued.get(w.stage, 0) + 1
+
+        per_stage = {}
+        for stage, priority in sorted(self.priorities.items(), key=lambda kv: kv[1]):
+            stats = self._wait_stats.get(stage)
+            recent = sorted(stats["recent"]) if stats else []
+            per_stage[stage] = {
+                "priority": priority,
+                "queued": queued.get(stage, 0),
+                "calls": stats["count"] if stats else 0,
+                "avg_wait_ms": round(stats["total"] / stats["count"] * 1000, 1) if stats else 0.0,
+                "p95_wait_ms": round(recent[min(len(recent) - 1, int(0.95 * len(recent)))] * 1000, 1) if recent else 0.0,
+                "max_wait_ms": round(stats["max"] * 1000, 1) if stats else 0.0,
+            }
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "queued": len(self._waiting),
+            "aging_seconds": self.aging_seconds,
+            "stages": per_stage,
+        }
@@ -0,0 +1,83 @@
+import itertools
+import time
+from contextlib import contextmanager
+
+# Degradation tiers (cheapest last)
+TIER_FULL = "full"            # Every message may use the LLM
+TIER_DEGRADED = "degraded"    # Menu / price / hours questions get template answers
+TIER_OFF_HOURS = "off_hours"  # Outside business hours: canned flow for new conversations
+
+
+class LoadShedder:
+    """
+    Tracks in-flight LLM work and picks a degradation tier.
+    Enters DEGRADED when too many calls are pending or the oldest one is too old,
+    and only recovers once load drops below recover_ratio x thresholds (hysteresis),
+    so the tier doesn't flap at the boundary.
+    """
+
+    def __init__(self, max_inflight: int, max_queue_age: float, recover_ratio: float,
+                 off_hours_enabled: bool = True):
+        self.max_inflight = max_inflight
+        self.max_queue_age = max_queue_age
+        self.recover_ratio = recover_ratio
+        self.off_hours_enabled = off_hours_enabled
+
+        self._ids = itertools.count()
+        self._in_flight = {}  # call id -> start (monotonic)
+        self._degraded = False
+        self._tier = TIER_FULL  # Load tier (full/degraded); off-hours depends on the tenant
+        self._tier_since = time.time()
+        self.stats = {"tier_changes": 0, "shed_replies": 0, "llm_calls": 0}
+
+    @contextmanager
+    def track(self):
+        """Wrap every LLM call so queue depth and age are known."""
+        call_id = next(self._ids)
+        self._in_flight[call_id] = time.monotonic()
+        self.stats["llm_calls"] += 1
+        try:
+            yield
+        finally:
+            self._in_flight.pop(call_id, None)
+
+    def oldest_age(self) -> float:
+        if not self._in_flight:
+            return 0.0
+        return time.monotonic() - min(self._in_flight.values())
+
+    def current_tier(self, is_open: bool = True) -> str:
+        """is_open: whether the shop handling this message is within business hours."""
+        inflight = len(self._in_flight)
+        age = self.oldest_age()
+
+        if self._degraded:
+            if inflight <= self.max_inflight * self.recover_ratio and age <= self.max_queue_age * self.recover_ratio:
+                self._degraded = False
+        elif inflight >= self.max_inflight or age >= self.max_queue_age:
+            self._degraded = True
+
+        tier = TIER_DEGRADED if self._degraded else TIER_FULL
+        if tier != self._tier:
+            print(f"🚦 LoadShedder: {self._tier} -> {tier} (in-flight={inflight}, oldest={age:.1f}s)")
+            self._tier = tier
+            self._tier_since = time.time()
+            self.stats["tier_changes"] += 1
+
+        if self.off_hours_enabled and not is_open:
+            return TIER_OFF_HOURS
+        return tier
+
+    def snapshot(self, is_open: bool = True) -> dict:
+        return {
+            "tier": self.current_tier(is_open=is_open),
+            "tier_since": self._tier_since,
+            "llm_in_flight": len(self._in_flight),
+            "oldest_llm_call_seconds": round(self.oldest_age(), 2),
+            "thresholds": {
+                "max_inflight": self.max_inflight,
+                "max_queue_age_seconds": self.max_queue_age,
+                "recover_ratio": self.recover_ratio,
+            },
+            **self.stats,
+        }
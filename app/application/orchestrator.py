@@ -1,99 +1,292 @@
 import asyncio
+import contextlib
+import contextvars
 import random
-from datetime import datetime, time
-import pytz
+from datetime import datetime, timezone
+from time import perf_counter
 
 from app.interfaces.IAiService import IAiService
 from app.interfaces.IOrderRepository import IOrderRepository
 from app.infrastructure.state_manager import state_manager, STATE_IDLE, STATE_ORDERING, STATE_CONFIRMING
+from app.infrastructure.rule_engine import rule_engine
+from app.application.load_shedder import LoadShedder, TIER_FULL, TIER_OFF_HOURS
+from app.application.llm_scheduler import PriorityLLMScheduler, STAGE_CHECKOUT, STAGE_ORDERING, STAGE_MENU, STAGE_GREETING, STAGE_BACKGROUND
+from app.application.direct_answers import DirectAnswerEngine, KIND_PRICE, KIND_AVAILABILITY, KIND_HOURS
+from app.application.recent_orders import RecentOrdersCache
+from app.application.conversation_memory import ConversationMemory
+from app.domain.canned_responses import OFF_HOURS_REPLY
+from app.domain.tenant import Tenant
+from app.infrastructure.tenant_registry import tenant_registry
+from app.core.config import settings
+from app.infrastructure.tracing import tracer
 # Ensure you have the NotificationService imported (even if passing via Type Hint only)
 # from app.infrastructure.notification_service import NotificationService 
 
 # --- CONFIG ---
-TIMEZONE = pytz.timezone("America/Guayaquil")
-BUSINESS_OPEN = time(7, 0)
-BUSINESS_CLOSE = time(18, 0)
-FRUSTRATION_KEYWORDS = ["molesto", "no contestan", "problema", "pesimo", "nadie responde", "queja"]
-BLOCKED_NUMBERS = {"+593967550507"}
-
-PAYMENT_INFO = """
-## ✨ Formas de Pago – En Dulce
-### 💛 Opción 1 – Banco Pichincha
-* **Cuenta:** 2100038192 (Cte)
-* **Titular:** Franklin Utreras
-* **CI:** 1715211676
-### 💚 Opción 2 – Produbanco
-* **Cuenta:** 12095108731 (Aho)
-* **Titular:** Carlos Peña
-"""
+# Shop-specific settings (payment info, blocked numbers, business hours, prompts)
+# live on the Tenant (app/domain/tenant.py), resolved from the receiving Twilio number.
+
+# Per-turn metadata for the conversation archive (intent, LLM calls/time), filled by _llm
+_turn_meta = contextvars.ContextVar("orchestrator_turn", default=None)
 
 class Orchestrator:
-    def __init__(self, ai_service: IAiService, order_repo: IOrderRepository, notifier):
+    def __init__(self, ai_service: IAiService, order_repo: IOrderRepository, notifier, archiver=None):
         self.ai_service = ai_service
         self.order_repo = order_repo
         self.notifier = notifier # Injected NotificationService
+        self.archiver = archiver # Optional ConversationArchiver (every turn -> Postgres, batched)
+        self.typing_delay = (2.0, 4.0) # Human-like pause on first message (None disables, e.g. replay)
+        self.load_shedder = LoadShedder(
+            max_inflight=settings.SHED_MAX_INFLIGHT_LLM,
+            max_queue_age=settings.SHED_MAX_QUEUE_AGE_SECONDS,
+            recover_ratio=settings.SHED_RECOVER_RATIO,
+            off_hours_enabled=settings.OFF_HOURS_MODE
+        )
+        self.llm_scheduler = PriorityLLMScheduler(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            aging_seconds=settings.LLM_PRIORITY_AGING_SECONDS,
+            priorities=settings.LLM_STAGE_PRIORITIES
+        )
+        self.direct_answers = DirectAnswerEngine()
+        self.recent_orders = RecentOrdersCache(
+            order_repo,
+            ttl=settings.REORDER_CACHE_TTL_SECONDS,
+            max_users=settings.REORDER_CACHE_MAX_USERS,
+            limit=settings.REORDER_LOOKBACK_ORDERS
+        )
+        self.memory = ConversationMemory(
+            enabled=settings.CONVERSATION_SUMMARY_ENABLED,
+            recent_messages=settings.SUMMARY_RECENT_MESSAGES,
+            summarizer=self._summarize
+        )
+
+    async def process_message(self, user_id: str, message_text: str, tenant: Tenant = None) -> str:
+        tenant = tenant or tenant_registry.default
+        started = perf_counter()
+        meta = {"intent": None, "state_before": None, "rules": [], "llm_calls": 0, "llm_ms": 0.0,
+                "session_reset": False}
+        token = _turn_meta.set(meta)
+        try:
+            with tracer.trace("turn", user_id=user_id, tenant=tenant.id) as turn_span:
+                response = await self._process_message(tenant, user_id, message_text)
+                turn_span.set_attribute("response_chars", len(response or ""))
+        finally:
+            _turn_meta.reset(token)
+
+        if self.archiver:
+            self.archiver.submit({
+                "tenant_id": tenant.id,
+                "user_phone": user_id,
+                "message": message_text,
+                "response": response,
+                "intent": meta["intent"],
+                "state_before": meta["state_before"],
+                "state_after": state_manager.get_state(tenant.session_key(user_id)),
+                "rules": meta["rules"],
+                "llm_calls": meta["llm_calls"],
+                "llm_ms": round(meta["llm_ms"], 1),
+                "latency_ms": round((perf_counter() - started) * 1000, 1),
+                "created_at": datetime.now(timezone.utc),
+            })
+        return response
 
-    async def process_message(self, user_id: str, message_text: str) -> str:
-        print(f"\n[ORCHESTRATOR] Processing message from {user_id}")
+    async def _process_message(self, tenant: Tenant, user_id: str, message_text: str) -> str:
+        print(f"\n[ORCHESTRATOR] Processing message from {user_id} ({tenant.id})")
+        sid = tenant.session_key(user_id)
         
-        # 1. CHECKS
-        if user_id in BLOCKED_NUMBERS: return ""
-        if any(w in message_text.lower() for w in FRUSTRATION_KEYWORDS):
-            return await self._trigger_handoff(user_id, "Cliente molesto")
+        # 1. CHECKS (Keyword rules: one pass, no LLM)
+        if user_id in tenant.blocked_numbers: return ""
+        with tracer.span("rules.match"):
+            rule_hits = rule_engine.match(message_text)
+        _turn_meta.get()["rules"] = sorted(rule_hits)
+        if "frustration" in rule_hits:
+            return await self._trigger_handoff(tenant, user_id, "Cliente molesto")
+
+        # Priority: Check for "Cancel" globally
+        if "cancel" in rule_hits:
+            self._reset_session(sid)
+            return "Listo, pedido cancelado."
 
         # 2. STATE
-        current_state = state_manager.get_state(user_id)
-        context = state_manager.get_context(user_id) or {} # Ensure dict
-        history = state_manager.get_history(user_id)
+        current_state = state_manager.get_state(sid)
+        context = state_manager.get_context(sid) or {} # Ensure dict
+        history = self.memory.prompt_history(sid) # Summary + cart facts + last messages
+        _turn_meta.get()["state_before"] = current_state
 
-        if not history: await asyncio.sleep(random.uniform(2.0, 4.0))
+        # Returning customers: their last orders load while the typing delay runs
+        if not history:
+            self.recent_orders.warm(tenant.id, user_id)
 
-        # 3. INTENT
-        intent = await self.ai_service.get_intent(message_text)
-        print(f"[ORCHESTRATOR] State: {current_state} | Intent: {intent}")
+        if not history and self.typing_delay: await asyncio.sleep(random.uniform(*self.typing_delay))
 
         # --- STATE MACHINE ---
         response = ""
-        
-        # Priority: Check for "Cancel" globally
-        if "cancel" in message_text.lower():
-            state_manager.clear_session(user_id)
-            return "Listo, pedido cancelado."
 
-        if current_state == STATE_ORDERING:
-            response = await self._handle_active_ordering(user_id, message_text, intent, context, history)
+        # "Lo mismo de siempre": previous order straight to the summary (no intent, no extraction)
+        if "reorder" in rule_hits and current_state != STATE_CONFIRMING and not context.get("items"):
+            response = await self._handle_reorder(tenant, user_id)
+
+        if response:
+            print(f"[ORCHESTRATOR] State: {current_state} -> {STATE_CONFIRMING} (reorder)")
+
+        # Active checkout states don't need the intent up front (saves an LLM call)
+        elif current_state == STATE_ORDERING:
+            print(f"[ORCHESTRATOR] State: {current_state} | Rules: {sorted(rule_hits)}")
+            response = await self._handle_active_ordering(tenant, user_id, message_text, None, context, history, rule_hits)
         
         elif current_state == STATE_CONFIRMING:
-            response = await self._handle_confirmation(user_id, message_text, context)
+            print(f"[ORCHESTRATOR] State: {current_state} | Rules: {sorted(rule_hits)}")
+            response = await self._handle_confirmation(tenant, user_id, message_text, context, history, rule_hits)
 
-        elif intent == "handoff":
-            response = await self._trigger_handoff(user_id, "Solicitud directa")
-        
-        elif intent == "order_intent":
-            state_manager.set_state(user_id, STATE_ORDERING)
-            response = await self._handle_active_ordering(user_id, message_text, intent, context, history)
-            
         else:
-            response = await self.ai_service.generate_response(message_text, intent, history)
+            # New conversations are shed first; checkout states above are always protected
+            tier = self.load_shedder.current_tier(is_open=tenant.is_open())
+
+            # Price / availability / hours from the structured menu: skips intent + generation.
+            # Tried before the shed templates, which are generic and can't quote a product.
+            if "order_request" not in rule_hits:
+                response = self._direct_answer(tenant, message_text, rule_hits)
+                if response:
+                    self.direct_answers.stats["llm_calls_saved"] += 2
+
+            if not response and tier != TIER_FULL:
+                response = self._shed_reply(tenant, tier, rule_hits)
+
+            if not response:
+                # 3. INTENT
+                intent = await self._llm(STAGE_MENU, self.ai_service.get_intent, message_text)
+                print(f"[ORCHESTRATOR] State: {current_state} | Intent: {intent} | Rules: {sorted(rule_hits)}")
+                response = await self._handle_idle(tenant, user_id, message_text, intent, context, history, rule_hits)
+            else:
+                print(f"[ORCHESTRATOR] State: {current_state} | Tier: {tier} | Rules: {sorted(rule_hits)}")
 
         if response:
-            state_manager.add_to_history(user_id, "User", message_text)
-            state_manager.add_to_history(user_id, "AI", response)
+            state_manager.add_to_history(sid, "User", message_text)
+            state_manager.add_to_history(sid, "AI", response)
+            if not _turn_meta.get()["session_reset"]:  # A reset turn has nothing to remember
+                self.memory.after_turn(sid, tenant)
         
         return response
 
+    def _reset_session(self, sid):
+        """Order cancelled / confirmed: fresh state, context and conversation memory."""
+        state_manager.clear_session(sid)
+        self.memory.reset(sid)
+        _turn_meta.get()["session_reset"] = True
+
+    async def _llm(self, stage, fn, *args, **kwargs):
+        """
+        Every LLM call goes through here: the load shedder sees the backlog
+        (queue wait included) and the scheduler serves checkout before small talk.
+        Background calls stay out of the shedder: queued behind customer turns,
+        they would otherwise age into a degraded tier on their own.
+        """
+        tracked = contextlib.nullcontext() if stage == STAGE_BACKGROUND else self.load_shedder.track()
+        with tracked, tracer.span("llm.call", stage=stage, method=fn.__name__) as call_span:
+            queued_at = perf_counter()
+            try:
+                async with self.llm_scheduler.slot(stage):
+                    call_span.set_attribute("queue_wait_ms", round((perf_counter() - queued_at) * 1000, 2))
+                    result = await fn(*args, **kwargs)
+            finally:
+                meta = _turn_meta.get()
+                if meta is not None:
+                    meta["llm_calls"] += 1
+                    meta["llm_ms"] += (perf_counter() - queued_at) * 1000
+            if meta is not None and fn.__name__ == "get_intent":
+                meta["intent"] = result
+            return result
+
+    async def _summarize(self, summary, messages, tenant):
+        """Rolling-summary update (background). Skipped while shedding load."""
+        if self.load_shedder.current_tier() != TIER_FULL:
+            return None
+        return await self._llm(STAGE_BACKGROUND, self.ai_service.summarize_conversation, summary, messages, tenant=tenant)
+
+    def _shed_reply(self, tenant, tier, rule_hits):
+        """Template answer for a degraded tier, or "" to fall through to the LLM."""
+        canned = tenant.canned_replies
+        reply = ""
+        if "hours_question" in rule_hits:
+            reply = canned.get("hours", "")
+        elif "price_question" in rule_hits:
+            reply = canned.get("price", "")
+        elif "menu_question" in rule_hits:
+            reply = canned.get("menu", "")
+
+        if not reply and tier == TIER_OFF_HOURS:
+            reply = OFF_HOURS_REPLY.format(open_time=tenant.business_open.strftime("%H:%M"))
+
+        if reply:
+            self.load_shedder.stats["shed_replies"] += 1
+        return reply
+
+    def _direct_answer(self, tenant, message_text, rule_hits, intent=None):
+        """Template answer from the parsed menu, or "" when the product isn't resolved confidently."""
+        if intent == "price_query" or "price_question" in rule_hits:
+            kind = KIND_PRICE
+        elif "hours_question" in rule_hits:
+            kind = KIND_HOURS
+        elif intent == "availability_query" or "availability_question" in rule_hits:
+            kind = KIND_AVAILABILITY
+        else:
+            return ""
+        with tracer.span("direct_answer", kind=kind):
+            return self.direct_answers.answer(kind, message_text, tenant)
+
     # --- HANDLERS ---
 
-    async def _trigger_handoff(self, user_id, reason):
+    async def _handle_idle(self, tenant, user_id, message_text, intent, context, history, rule_hits):
+        if intent == "handoff":
+            return await self._trigger_handoff(tenant, user_id, "Solicitud directa")
+        
+        if intent == "order_intent":
+            state_manager.set_state(tenant.session_key(user_id), STATE_ORDERING)
+            return await self._handle_active_ordering(tenant, user_id, message_text, intent, context, history, rule_hits)
+            
+        if intent in ("price_query", "availability_query"):
+            reply = self._direct_answer(tenant, message_text, rule_hits, intent)
+            if reply:
+                self.direct_answers.stats["llm_calls_saved"] += 1
+                return reply
+
+        stage = STAGE_GREETING if intent in ("greeting", "closing", "other") else STAGE_MENU
+        started = perf_counter()
+        response = await self._llm(stage, self.ai_service.generate_response, message_text, intent, history, tenant=tenant)
+        if intent in ("price_query", "availability_query", "menu_query"):
+            self.direct_answers.record_llm_response((perf_counter() - started) * 1000)
+        return response
+
+    async def _handle_reorder(self, tenant, user_id):
+        """Loads the customer's last order as the cart, or "" if there is none."""
+        orders = await self.recent_orders.get(tenant.id, user_id)
+        last_items = orders[0]["items"] if orders else None
+        items = [dict(item, action="add") for item in last_items or [] if item.get("product")]
+        if not items:
+            return ""
+
+        sid = tenant.session_key(user_id)
+        state_manager.update_context(sid, {"items": items})
+        state_manager.set_state(sid, STATE_CONFIRMING)
+        self.recent_orders.stats["reorders"] += 1
+        summary = self._generate_confirmation_summary(state_manager.get_context(sid))
+        return f"¡Claro veci! Le repito su último pedido 😊\n\n{summary}"
+
+    async def _trigger_handoff(self, tenant, user_id, reason):
         # Notify Admin
-        self.notifier.notify_admin_new_order(user_id, [{"product": f"⚠️ HANDOFF: {reason}"}])
+        self.notifier.notify_admin_new_order(user_id, [{"product": f"⚠️ HANDOFF: {reason}"}], admin_phone=tenant.admin_phone)
         return "Para ayudarle mejor, le voy a pasar con una persona del equipo 😊\nUn momento por favor."
 
-    async def _handle_active_ordering(self, user_id, message_text, intent, context, history):
-        triggers = ["listo", "eso es todo", "confirmar", "ya", "gracias", "fin"]
-        
+    async def _handle_active_ordering(self, tenant, user_id, message_text, intent, context, history, rule_hits):
+        sid = tenant.session_key(user_id)
+
+        # 0. SHORT-CIRCUIT: "listo" / "eso es todo" closes the cart without extraction
+        if "checkout" in rule_hits:
+            state_manager.set_state(sid, STATE_CONFIRMING)
+            return self._generate_confirmation_summary(context)
+
         # 1. EXTRACT DATA
-        extraction_data = await self.ai_service.extract_order_items(message_text, history)
+        extraction_data = await self._llm(STAGE_ORDERING, self.ai_service.extract_order_items, message_text, history, tenant=tenant)
         new_items = extraction_data.get("items", [])
         new_modifiers = extraction_data.get("modifiers", {})
         new_delivery = extraction_data.get("delivery_info", {})
@@ -137,13 +330,9 @@ class Orchestrator:
             "modifiers": current_modifiers,
             "delivery_info": current_delivery
         }
-        state_manager.update_context(user_id, updated_context)
-
-        # 3. TRANSITION & RESPONSE
-        if any(t == message_text.lower().strip() for t in triggers):
-            state_manager.set_state(user_id, STATE_CONFIRMING)
-            return self._generate_confirmation_summary(updated_context)
+        state_manager.update_context(sid, updated_context)
 
+        # 3. RESPONSE
         # Dynamic Response based on Action
         if new_items:
             action = new_items[0].get("action", "add")
@@ -161,15 +350,17 @@ class Orchestrator:
         elif new_delivery.get("method"):
              return f"Entendido, será para {new_delivery['method']}. ¿Algo más?"
 
-        # Fallback to AI Chat
-        return await self.ai_service.generate_response(message_text, intent, history)
+        # Fallback to AI Chat (intent is only needed here)
+        intent = intent or await self._llm(STAGE_ORDERING, self.ai_service.get_intent, message_text)
+        return await self._llm(STAGE_ORDERING, self.ai_service.generate_response, message_text, intent, history, tenant=tenant)
 
 
-    async def _handle_confirmation(self, user_id, message_text, context):
+    async def _handle_confirmation(self, tenant, user_id, message_text, context, history, rule_hits):
         """Smart Checkout Gate"""
+        sid = tenant.session_key(user_id)
         
-        # 1. If user says YES to summary
-        if any(w in message_text.lower() for w in ["si", "claro", "ok", "correcto", "simon"]):
+        # 1. If user says YES to summary (word-bounded: "si" no longer matches inside "sino")
+        if "affirmative" in rule_hits:
             
             # --- VALIDATION GATES ---
             delivery_info = context.get("delivery_info", {})
@@ -191,18 +382,20 @@ class Orchestrator:
             # TODO: Ideally save modifiers/delivery to DB too. 
             # For now passing items list.
             
-            success = self.order_repo.save_order(user_id, final_order_data)
+            success = self.order_repo.save_order(user_id, final_order_data, tenant_id=tenant.id)
             
             if success:
-                state_manager.clear_session(user_id)
-                self.notifier.notify_admin_new_order(user_id, final_order_data)
-                return f"Listo, su pedido está confirmado 🎉.\n\n{PAYMENT_INFO}"
+                self._reset_session(sid)
+                self.recent_orders.invalidate(tenant.id, user_id)
+                self.notifier.notify_admin_new_order(user_id, final_order_data, admin_phone=tenant.admin_phone)
+                return f"Listo, su pedido está confirmado 🎉.\n\n{tenant.payment_info}"
             else:
                 return "Uy, hubo un error guardando el pedido. Intente de nuevo."
 
         # 2. If user provides missing info (Address/Method) logic
         # We re-run extraction to see if they answered the Gate question
-        extraction = await self.ai_service.extract_order_items(message_text, "")
+        # History keeps an address given earlier in the chat ("a la dirección que le di")
+        extraction = await self._llm(STAGE_CHECKOUT, self.ai_service.extract_order_items, message_text, history, tenant=tenant)
         new_delivery = extraction.get("delivery_info", {})
         
         if new_delivery.get("method") or new_delivery.get("address"):
@@ -211,13 +404,13 @@ class Orchestrator:
             if new_delivery.get("method"): current_delivery["method"] = new_delivery["method"]
             if new_delivery.get("address"): current_delivery["address"] = new_delivery["address"]
             
-            state_manager.update_context(user_id, {"delivery_info": current_delivery})
+            state_manager.update_context(sid, {"delivery_info": current_delivery})
             
             # Re-summarize to confirm the new details
-            return self._generate_confirmation_summary(state_manager.get_context(user_id))
+            return self._generate_confirmation_summary(state_manager.get_context(sid))
 
         # 3. If user says NO or wants changes
-        state_manager.set_state(user_id, STATE_ORDERING)
+        state_manager.set_state(sid, STATE_ORDERING)
         return "Entendido, ¿qué desea cambiar o agregar?"
 
     def _generate_confirmation_summary(self, context):
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from app.interfaces.IOrderRepository import IOrderRepository
+
+
+class RecentOrdersCache:
+    """
+    Per-customer cache of their latest orders at one shop (LRU + TTL), for the reorder path.
+    warm() is called on the first message of a session and fetches in the
+    background (it overlaps the typing delay), so "lo mismo de siempre" a few
+    messages later is answered without touching Postgres.
+    """
+
+    def __init__(self, order_repo: IOrderRepository, ttl: float, max_users: int, limit: int):
+        self.order_repo = order_repo
+        self.ttl = ttl
+        self.max_users = max_users
+        self.limit = limit
+        self._entries = OrderedDict()  # (tenant_id, user_id) -> (fetched_at, orders)
+        self._pending = {}             # (tenant_id, user_id) -> asyncio.Task (warm in progress)
+        self.stats = {"hits": 0, "misses": 0, "warms": 0, "reorders": 0}
+
+    def _fresh(self, key: tuple):
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            self._entries.move_to_end(key)
+            return entry[1]
+        return None
+
+    async def _fetch(self, key: tuple) -> list:
+        tenant_id, user_id = key
+        try:
+            orders = await asyncio.to_thread(
+                self.order_repo.get_recent_orders, user_id, tenant_id=tenant_id, limit=self.limit
+            )
+        except Exception as e:
+            print(f"❌ RecentOrdersCache Error: {e}")
+            orders = []
+        self._entries[key] = (time.monotonic(), orders)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+        return orders
+
+    def warm(self, tenant_id: str, user_id: str):
+        key = (tenant_id, user_id)
+        if self._fresh(key) is not None or key in self._pending:
+            return
+        self.stats["warms"] += 1
+        task = asyncio.create_task(self._fetch(key))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+    async def get(self, tenant_id: str, user_id: str) -> list:
+        key = (tenant_id, user_id)
+        orders = self._fresh(key)
+        if orders is not None:
+            self.stats["hits"] += 1
+            return orders
+        pending = self._pending.get(key)
+        if pending:
+            self.stats["hits"] += 1
+            return await pending
+        self.stats["misses"] += 1
+        return await self._fetch(key)
+
+    def invalidate(self, tenant_id: str, user_id: str):
+        """Called after the customer confirms a new order."""
+        self._entries.pop((tenant_id, user_id), None)
+
+    def snapshot(self) -> dict:
+        return {"cached_users": len(self._entries), **self.stats}
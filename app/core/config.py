@@ -20,6 +20,74 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str | None = None
     POSTGRES_DB: str | None = None
 
+    # --- Webhook Idempotency (Twilio retries on timeout) ---
+    WEBHOOK_DEDUP_TTL: int = 3600          # How long a processed MessageSid is remembered
+    WEBHOOK_DEDUP_PENDING_TTL: int = 60    # Claim expiry if the first worker dies mid-turn
+    WEBHOOK_DEDUP_WAIT_SECONDS: float = 15.0  # Max wait for an in-flight duplicate
+
+    # --- Traffic Recording (opt-in, for offline replay) ---
+    TRAFFIC_RECORD_PATH: str | None = None  # e.g. "data/traffic.jsonl.gz"
+
+    # --- Keyword Rules (guardrails & state triggers) ---
+    RULES_PATH: str = "data/rules.json"
+    RULES_RELOAD_SECONDS: float = 5.0  # How often the file's mtime is checked
+
+    # --- Load Shedding (tiered degradation under LLM backlog) ---
+    SHED_MAX_INFLIGHT_LLM: int = 8           # Concurrent LLM calls before degrading
+    SHED_MAX_QUEUE_AGE_SECONDS: float = 12.0 # Age of the oldest pending LLM call before degrading
+    SHED_RECOVER_RATIO: float = 0.5          # Back to full once load drops below ratio x thresholds
+    OFF_HOURS_MODE: bool = False             # Canned flow outside each tenant's business_open/business_close
+
+    # --- LLM Scheduling (priority by conversation stage; lower number = served first) ---
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_PRIORITY_AGING_SECONDS: float = 5.0  # Each 5s waiting promotes a call one level (no starvation)
+    LLM_STAGE_PRIORITIES: dict[str, int] = {"checkout": 0, "ordering": 1, "menu": 2, "greeting": 3, "background": 4}
+
+    # --- Multi-Tenant (several shops per deployment) ---
+    TENANTS_PATH: str | None = None    # e.g. "data/tenants.json" (see tenants.example.json); unset = En-Dulce only
+    MAX_LOADED_MENU_SHARDS: int = 8                  # FAISS indexes kept in RAM (LRU)
+
+    # --- Embeddings (RAG) ---
+    EMBEDDING_BACKEND: str = "huggingface"  # "huggingface" (PyTorch) or "onnx" (int8 ONNX Runtime, no torch)
+    EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
+    ONNX_EMBEDDING_MODEL_DIR: str = "data/models/all-MiniLM-L6-v2-onnx"  # See app/tools/export_onnx_embeddings.py
+    ONNX_EMBEDDING_THREADS: int = 0         # 0 = ONNX Runtime default (all cores)
+
+    # --- Tracing & Profiling ---
+    TRACE_EXPORT_PATH: str | None = None  # e.g. "data/traces.jsonl" (unset = tracing off)
+    TRACE_SAMPLE_RATE: float = 1.0
+    ADMIN_TOKEN: str | None = None        # Required (X-Admin-Token header) for /admin/profile
+    PROFILE_MAX_SECONDS: int = 60
+
+    # --- Conversation Archive (every turn batched into Postgres) ---
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_BATCH_SIZE: int = 200        # Flush when this many turns are buffered...
+    ARCHIVE_FLUSH_SECONDS: float = 5.0   # ...or when the oldest buffered turn is this old
+    ARCHIVE_MAX_QUEUE: int = 10000       # Beyond this, turns are dropped (and counted), never awaited
+
+    # --- Rate Limiting (per sender + global token buckets, shared via Redis) ---
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PHONE_CAPACITY: int = 8                  # Burst a single sender may send
+    RATE_LIMIT_PHONE_REFILL_PER_MINUTE: float = 6.0
+    RATE_LIMIT_GLOBAL_CAPACITY: int = 200               # Burst across all senders
+    RATE_LIMIT_GLOBAL_REFILL_PER_MINUTE: float = 600.0
+    RATE_LIMIT_ACTION: str = "reply"                    # "reply" (polite, once per cooldown) or "drop" (silent)
+    RATE_LIMIT_REPLY: str = "Veci, me está escribiendo muy rápido 😅 Deme un momentito y le respondo 🙏"
+    RATE_LIMIT_GLOBAL_REPLY: str = "Veci, en este momento tenemos muchos mensajes 🙏 En un ratito le respondemos 😊"  # "" = silent
+    RATE_LIMIT_REPLY_COOLDOWN_SECONDS: int = 60
+    RATE_LIMIT_AUTOBLOCK_STRIKES: int = 30              # Limited messages before auto-block (0 = never)
+    RATE_LIMIT_AUTOBLOCK_WINDOW_SECONDS: int = 600
+    RATE_LIMIT_AUTOBLOCK_SECONDS: int = 3600            # Auto-blocks expire; manual ones don't
+
+    # --- Reorder ("lo mismo de siempre") ---
+    REORDER_CACHE_TTL_SECONDS: int = 900   # Per-customer recent orders, warmed on the first message
+    REORDER_CACHE_MAX_USERS: int = 5000
+    REORDER_LOOKBACK_ORDERS: int = 3
+
+    # --- Conversation Memory (rolling summary + cart facts instead of the raw 6-message window) ---
+    CONVERSATION_SUMMARY_ENABLED: bool = True
+    SUMMARY_RECENT_MESSAGES: int = 2  # Raw messages kept verbatim in prompts
+
     # --- Configuration ---
     model_config = SettingsConfigDict(
         env_file=".env",
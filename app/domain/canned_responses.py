@@ -0,0 +1,21 @@
+# Template answers used when the LLM is shed (high load or off-hours).
+# Keep them in sync with data/menu.md.
+
+HOURS_REPLY = """Con gusto veci 😊 Nuestros horarios:
+• Centro Histórico (Olmedo Oe3-26 y Guayaquil): Lun a Vie 7:30 a.m. – 6:00 p.m., Sáb y feriados 8:00 a.m. – 5:00 p.m.
+• Museo del Alabado (Cuenca N1-41): Mié a Dom 9:30 a.m. – 4:45 p.m."""
+
+MENU_REPLY = """Claro que si 😊 Tenemos:
+• Tortas tradicionales (Margarita de Vainilla o Chocolate con Frutos Rojos)
+• Especialidades: Pasión de Chocolate, Torta Mocca, Selva Negra
+• Bocaditos de sal y de dulce (bajo reserva, 8 días de anticipación)
+¿Qué le gustaría pedir?"""
+
+PRICE_REPLY = """Ya le confirmo 😊
+• Margarita de Vainilla con Frutos Rojos: desde $8.50 (5 a 8 porciones)
+• Margarita de Chocolate con Frutos Rojos: desde $9.00 (5 a 8 porciones)
+• Bocaditos: $30 o $50 el ciento
+¿Para cuántas personas sería?"""
+
+OFF_HOURS_REPLY = """Hola veci 😊 En este momento estamos fuera de horario.
+Le atendemos desde las {open_time}. ¡Escríbanos y con gusto tomamos su pedido!"""
@@ -0,0 +1,168 @@
+import re
+from pydantic import BaseModel
+
+# Live availability toggled from /admin/menu (In-memory for this MVP)
+MENU_DB = [
+    {"name": "Torta de Chocolate", "price": 20, "is_active": True},
+    {"name": "Cheesecake", "price": 25, "is_active": True},
+    {"name": "Desayuno Clásico", "price": 8, "is_active": True},
+    {"name": "Desayuno Especial", "price": 12, "is_active": True},
+    {"name": "Humita", "price": 1.50, "is_active": True},
+]
+
+
+class Portion(BaseModel):
+    label: str           # "5 a 8 porciones"
+    min_people: int
+    max_people: int
+    price: float
+
+
+class Product(BaseModel):
+    name: str
+    category: str = ""
+    portions: list[Portion] = []   # Portion/price table (tortas)
+    price: float | None = None     # Flat price (MENU_DB items)
+    price_note: str | None = None  # Group price ("$30 el ciento")
+    order_note: str | None = None  # Section lead time ("Pedidos bajo reserva y con 8 días de anticipación.")
+    is_active: bool = True
+    stock_tracked: bool = False    # is_active comes from MENU_DB (live); otherwise it's just a default
+
+
+class Branch(BaseModel):
+    name: str
+    address: str = ""
+    schedule: list[str] = []       # ["Lunes a Viernes: 7:30 a.m. – 6:00 p.m.", ...]
+
+
+class MenuCatalog(BaseModel):
+    products: list[Product] = []
+    branches: list[Branch] = []
+    flavors: list[str] = []        # Cake bases / fillings ("Maracuyá"): menu words that aren't products
+
+
+# --- Markdown parsing (data/menu.md layout) ---
+_EMOJI = re.compile(r"[^\w\s$.,:;()/+–\-*'\"!¡¿?&%]", re.UNICODE)
+_PORTION = re.compile(r"(\d+)\s*a\s*(\d+)\s*porciones.*?\$\s*(\d+(?:[.,]\d+)?)", re.IGNORECASE)
+_GROUP_PRICE = re.compile(r"^(.*?)\s*[–-]\s*(\$\s*\d+(?:[.,]\d+)?.*)$")
+_FLAVOR_SECTION = re.compile(r"bases|rellenos|sabores", re.IGNORECASE)
+_LEAD_TIME = re.compile(r"reserva|anticipaci", re.IGNORECASE)
+
+
+def _clean(line: str) -> str:
+    """Strips markdown markers, emojis and notes like *(Nuevo)*."""
+    line = re.sub(r"\*\((.*?)\)\*", "", line)
+    line = line.replace("**", "").replace("*", "").lstrip("#-• ").strip()
+    return re.sub(r"\s+", " ", _EMOJI.sub("", line)).strip()
+
+
+def parse_menu_markdown(text: str) -> MenuCatalog:
+    """
+    Turns the menu markdown into structured data:
+    - "## Name" + "- N a M porciones → $X" lines  -> Product with portions
+    - "### Category – $X el ciento" + "* Item" lines -> Product with price_note
+    - "### ... Especialidades" + "* Item" lines    -> Product without price
+    - "### Bases / Rellenos" + "* Item" lines       -> flavors (not products)
+    - "Horarios de Atención" section               -> Branches with schedules
+    """
+    catalog = MenuCatalog()
+    current_product = None
+    current_group = None      # (category, price_note) for bullet items
+    current_branch = None
+    in_flavors = False        # Inside "Bases Disponibles" / "Rellenos Disponibles"
+    section_note = None       # Lead time stated under a "## ..." section, for its items
+    in_hours = False
+    pending_day = None
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line == "---":
+            continue
+
+        if line.startswith("#"):
+            level = len(line) - len(line.lstrip("#"))
+            title = _clean(line)
+            current_product, current_group, pending_day = None, None, None
+            in_flavors = False
+
+            if "horario" in title.lower():
+                in_hours = True
+                continue
+            if level <= 2:
+                in_hours = False
+                current_branch = None
+                section_note = None
+
+            if in_hours and level >= 3:
+                current_branch = Branch(name=title)
+                catalog.branches.append(current_branch)
+            elif level == 2:
+                current_product = Product(name=title)
+                catalog.products.append(current_product)
+            elif level >= 3:
+                match = _GROUP_PRICE.match(title)
+                if match:
+                    current_group = (match.group(1).strip(), match.group(2).strip())
+                elif "especialidad" in title.lower():
+                    current_group = (title, None)
+                elif _FLAVOR_SECTION.search(title):
+                    in_flavors = True
+            continue
+
+        if in_hours and current_branch:
+            cleaned = _clean(line)
+            if "direcci" in cleaned.lower():
+                current_branch.address = cleaned.split(":", 1)[-1].strip()
+            elif line.startswith("**"):
+                pending_day = cleaned
+            elif pending_day:
+                current_branch.schedule.append(f"{pending_day}: {cleaned}")
+                pending_day = None
+            elif current_branch.address and line.startswith("*("):
+                current_branch.address += f" {line.strip('*')}"
+            continue
+
+        portion = _PORTION.search(line)
+        if current_product and portion:
+            lo, hi, price = portion.groups()
+            current_product.portions.append(Portion(
+                label=f"{lo} a {hi} porciones",
+                min_people=int(lo), max_people=int(hi),
+                price=float(price.replace(",", "."))
+            ))
+            continue
+
+        if line.startswith("**") and _LEAD_TIME.search(line):
+            section_note = _clean(line)
+            continue
+
+        if in_flavors and line[:1] in "*-•":
+            catalog.flavors.append(_clean(line))
+            continue
+
+        if current_group and line[:1] in "*-•":
+            category, note = current_group
+            catalog.products.append(Product(
+                name=_clean(line), category=category, price_note=note, order_note=section_note
+            ))
+
+    # Headings that never got a price table are section titles, not products
+    catalog.products = [p for p in catalog.products if p.portions or p.price_note or p.category]
+    return catalog
+
+
+def merge_availability(catalog: MenuCatalog, menu_db: list) -> MenuCatalog:
+    """Overlays MENU_DB (flat prices + is_active) on the parsed catalog."""
+    by_name = {p.name.lower(): p for p in catalog.products}
+    for entry in menu_db:
+        product = by_name.get(entry["name"].lower())
+        if product:
+            product.is_active = entry["is_active"]
+            product.stock_tracked = True
+            if product.price is None and not product.portions:
+                product.price = entry.get("price")
+        else:
+            catalog.products.append(Product(
+                name=entry["name"], price=entry.get("price"), is_active=entry["is_active"], stock_tracked=True
+            ))
+    return catalog
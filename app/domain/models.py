@@ -1,11 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Text, Float, Index
 from sqlalchemy.sql import func
 from app.infrastructure.database import Base
+from app.domain.tenant import DEFAULT_TENANT_ID
 
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, default=DEFAULT_TENANT_ID)  # Shop that took the order
     user_phone = Column(String, index=True)
     status = Column(String, default="pending")  # pending, confirmed, cancelled
     
@@ -14,4 +16,30 @@ class Order(Base):
     items = Column(JSON) 
     
     total_price = Column(String) # Storing as string to keep it simple (e.g. "$25.50")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # "Last order of this customer at this shop" (reorder path) is an index range scan
+        Index("ix_orders_tenant_user_phone_created_at", "tenant_id", "user_phone", "created_at"),
+        # Per-shop dashboard (latest orders)
+        Index("ix_orders_tenant_created_at", "tenant_id", "created_at"),
+    )
+
+
+class ConversationTurn(Base):
+    """One inbound message + reply, archived for prompt tuning / intent examples / cache seeds."""
+    __tablename__ = "conversation_turns"
+
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, index=True)
+    user_phone = Column(String, index=True)
+    message = Column(Text)
+    response = Column(Text)
+    intent = Column(String)          # None when answered without an intent call (rules, templates)
+    state_before = Column(String)
+    state_after = Column(String)
+    rules = Column(JSON)             # Keyword rules that fired
+    llm_calls = Column(Integer)
+    llm_ms = Column(Float)           # Time spent in LLM calls (queue wait included)
+    latency_ms = Column(Float)       # Whole turn, inside the orchestrator
+    created_at = Column(DateTime(timezone=True), index=True)
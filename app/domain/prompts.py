@@ -79,4 +79,20 @@ RETURN JSON FORMAT:
 }}
 
 USER INPUT: "{user_input}"
-"""
\ No newline at end of file
+"""
+
+SUMMARY_PROMPT = """
+You keep a running summary of a WhatsApp chat between a bakery assistant and a customer.
+Update the PREVIOUS SUMMARY with the NEW MESSAGES.
+Keep only what matters for the order: products and quantities discussed, people/portions,
+dates and times, flavors, dedication text, pickup or delivery, address, open questions.
+Drop greetings and small talk. Write in Spanish, at most 60 words.
+
+PREVIOUS SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+
+Return ONLY the updated summary.
+"""
@@ -0,0 +1,59 @@
+from datetime import datetime, time
+import pytz
+from pydantic import BaseModel, Field
+
+from app.domain.canned_responses import HOURS_REPLY, MENU_REPLY, PRICE_REPLY
+
+DEFAULT_TENANT_ID = "en-dulce"
+
+# --- Defaults (the original single-tenant shop) ---
+DEFAULT_TIMEZONE = "America/Guayaquil"
+DEFAULT_BUSINESS_OPEN = time(7, 0)
+DEFAULT_BUSINESS_CLOSE = time(18, 0)
+DEFAULT_BLOCKED_NUMBERS = ["+593967550507"]
+
+DEFAULT_PAYMENT_INFO = """
+## ✨ Formas de Pago – En Dulce
+### 💛 Opción 1 – Banco Pichincha
+* **Cuenta:** 2100038192 (Cte)
+* **Titular:** Franklin Utreras
+* **CI:** 1715211676
+### 💚 Opción 2 – Produbanco
+* **Cuenta:** 12095108731 (Aho)
+* **Titular:** Carlos Peña
+"""
+
+
+class Tenant(BaseModel):
+    """One shop served by this deployment, selected by the Twilio number it receives on."""
+    id: str
+    name: str
+    twilio_numbers: list[str] = []           # Receiving numbers (the webhook's "To")
+    menu_path: str = "data/menu.md"          # Catalog for RAG (one FAISS shard per path)
+    system_prompt: str | None = None         # None = shared SYSTEM_PROMPT
+    system_prompt_path: str | None = None    # Alternative to inline system_prompt
+    payment_info: str = ""
+    blocked_numbers: list[str] = []
+    admin_phone: str | None = None           # None = settings.ADMIN_PHONE_NUMBER
+    timezone: str = DEFAULT_TIMEZONE
+    business_open: time = DEFAULT_BUSINESS_OPEN
+    business_close: time = DEFAULT_BUSINESS_CLOSE
+    # Template answers when the LLM is shed: keys "hours", "price", "menu"
+    canned_replies: dict[str, str] = Field(default_factory=dict)
+
+    def session_key(self, user_id: str) -> str:
+        """State/history key: the default shop keeps the original keys (no migration)."""
+        return user_id if self.id == DEFAULT_TENANT_ID else f"{self.id}:{user_id}"
+
+    def is_open(self, now: datetime = None) -> bool:
+        now = now or datetime.now(pytz.timezone(self.timezone))
+        return self.business_open <= now.time() < self.business_close
+
+
+DEFAULT_TENANT = Tenant(
+    id=DEFAULT_TENANT_ID,
+    name="En-Dulce",
+    payment_info=DEFAULT_PAYMENT_INFO,
+    blocked_numbers=DEFAULT_BLOCKED_NUMBERS,
+    canned_replies={"hours": HOURS_REPLY, "price": PRICE_REPLY, "menu": MENU_REPLY},
+)
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.domain.models import ConversationTurn
+from app.infrastructure.database import SessionLocal
+
+_STOP = object()  # Queued by stop(): the consumer flushes what it holds and exits
+
+
+class ConversationArchiver:
+    """
+    Buffers every conversation turn in memory and writes them to Postgres in
+    batches (one multi-row INSERT per flush, run in a worker thread).
+
+    submit() never blocks the webhook: if the DB falls behind and the queue is
+    full, turns are dropped and counted instead of applying backpressure to users.
+    A batch is flushed when it reaches batch_size or flush_seconds after its first turn.
+    """
+
+    def __init__(self, batch_size: int, flush_seconds: float, max_queue: int):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "dropped": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    # --- Producer (webhook path) ---
+
+    def submit(self, record: dict):
+        try:
+            self._queue.put_nowait(record)
+            self.stats["submitted"] += 1
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    # --- Lifecycle ---
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            print(f"🗄️ ConversationArchiver: Batching turns ({self.batch_size} rows / {self.flush_seconds}s)")
+
+    async def stop(self):
+        """Flushes whatever is buffered (called on shutdown)."""
+        if self._task:
+            # Behind every pending turn, so the consumer writes its open batch before exiting
+            await self._queue.put(_STOP)
+            await self._task
+            self._task = None
+
+        batch = []  # Turns submitted after the stop marker (or archiver never started)
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        for i in range(0, len(batch), self.batch_size):
+            await self._flush(batch[i:i + self.batch_size])
+
+    # --- Consumer ---
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            deadline = loop.time() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, batch)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            # The archive is best-effort: losing a batch must never affect conversations
+            print(f"❌ ConversationArchiver Error ({len(batch)} turns dropped): {e}")
+            self.stats["failed_batches"] += 1
+            self.stats["dropped"] += len(batch)
+        self.stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    def _write(self, batch: list):
+        session = SessionLocal()
+        try:
+            session.execute(insert(ConversationTurn).values(batch))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def snapshot(self) -> dict:
+        return {"queued": self._queue.qsize(), **self.stats}
+
+# Global Instance
+conversation_archiver = ConversationArchiver(
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    flush_seconds=settings.ARCHIVE_FLUSH_SECONDS,
+    max_queue=settings.ARCHIVE_MAX_QUEUE
+)
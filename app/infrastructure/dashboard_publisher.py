@@ -0,0 +1,127 @@
+import asyncio
+import json
+from collections import deque
+from types import SimpleNamespace
+
+from app.domain.tenant import DEFAULT_TENANT_ID
+
+
+class DashboardPublisher:
+    """
+    Single shared publisher for the admin dashboards (Server-Sent Events).
+    - save_order() pushes new orders here, /admin/menu/toggle pushes availability changes.
+    - Keeps the latest orders of each shop in memory, so page loads don't hit Postgres once primed.
+    - Every connected dashboard of a shop gets the same pre-formatted event: DB load
+      stays constant no matter how many dashboards are open. Shops only see their own orders.
+    """
+
+    def __init__(self, max_recent: int = 20, heartbeat_seconds: float = 15.0, queue_size: int = 100):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        self.max_recent = max_recent
+        self._subscribers = {}     # queue -> tenant_id
+        self._recent_orders = {}   # tenant_id -> deque of order views (newest first)
+        self._primed = set()       # tenant_ids whose snapshot was loaded from the DB
+        self._loop = None
+        self.stats = {"events_published": 0, "slow_clients_dropped": 0}
+
+    # --- Order snapshot ---
+
+    def is_primed(self, tenant_id: str) -> bool:
+        return tenant_id in self._primed
+
+    def prime(self, tenant_id: str, orders: list):
+        """Seed a shop's snapshot from the DB once (orders newest first)."""
+        self._recent_orders[tenant_id] = deque((self._to_view(o) for o in orders), maxlen=self.max_recent)
+        self._primed.add(tenant_id)
+
+    def invalidate(self, tenant_id: str):
+        """Snapshot may be missing an order: the next page load re-reads it from the DB."""
+        self._primed.discard(tenant_id)
+
+    def recent_orders(self, tenant_id: str) -> list:
+        return list(self._recent_orders.get(tenant_id, ()))
+
+    @staticmethod
+    def _to_view(order) -> SimpleNamespace:
+        # Plain attributes (not a dict) so the Jinja template can use order.items
+        return SimpleNamespace(
+            id=order.id,
+            tenant_id=order.tenant_id or DEFAULT_TENANT_ID,
+            user_phone=order.user_phone,
+            status=order.status,
+            items=order.items or [],
+            total_price=order.total_price,
+            created_at=order.created_at,
+        )
+
+    # --- Publishing ---
+
+    def publish_order(self, order):
+        view = self._to_view(order)
+        if view.tenant_id in self._primed:
+            # Updated orders replace their old row, new ones go on top
+            recent = self._recent_orders[view.tenant_id]
+            existing = [o for o in recent if o.id != view.id]
+            recent.clear()
+            recent.extend([view] + existing[:self.max_recent - 1])
+
+        data = dict(vars(view))
+        data["created_at"] = view.created_at.strftime("%d/%m %H:%M") if view.created_at else ""
+        self._publish("order", data, view.tenant_id)
+
+    def publish_menu(self, product: dict, tenant_id: str = DEFAULT_TENANT_ID):
+        # MENU_DB (the /admin/menu toggles) belongs to the default shop
+        self._publish("menu", {"name": product["name"], "is_active": product["is_active"]}, tenant_id)
+
+    def _publish(self, event: str, data: dict, tenant_id: str):
+        message = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+        self.stats["events_published"] += 1
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if self._loop and running is not self._loop:
+            # Called from a worker thread (e.g. a sync route): hop onto the event loop
+            self._loop.call_soon_threadsafe(self._fan_out, message, tenant_id)
+        else:
+            self._fan_out(message, tenant_id)
+
+    def _fan_out(self, message: str, tenant_id: str):
+        for queue, subscriber_tenant in list(self._subscribers.items()):
+            if subscriber_tenant != tenant_id:
+                continue
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Client isn't reading: disconnect it (its stream loop exits) instead of buffering forever
+                self._subscribers.pop(queue, None)
+                self.stats["slow_clients_dropped"] += 1
+
+    # --- Subscribing ---
+
+    async def stream(self, tenant_id: str):
+        """Async generator of SSE chunks for one dashboard connection (one shop's events)."""
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = tenant_id
+        try:
+            yield "retry: 3000\n\n"
+            while queue in self._subscribers:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message
+        finally:
+            self._subscribers.pop(queue, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+# Global Instance
+dashboard_publisher = DashboardPublisher()
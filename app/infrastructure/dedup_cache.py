@@ -0,0 +1,169 @@
+import asyncio
+import time
+import redis
+from redis.exceptions import RedisError
+from app.core.config import settings
+
+# Placeholder stored while the first delivery of a MessageSid is still being processed
+PENDING_MARKER = "__pending__"
+EMPTY_TWIML = """<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+</Response>"""
+
+
+class MessageDedupCache:
+    """
+    Idempotency cache for the Twilio webhook, keyed by MessageSid.
+    - First delivery claims the SID (SET NX) and processes normally.
+    - Retries while the first is in flight wait for its TwiML.
+    - Retries after completion get the cached TwiML back (no orchestrator call).
+    """
+
+    def __init__(self):
+        try:
+            self.redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_connect_timeout=1
+            )
+            self.redis.ping()
+            self.redis_available = True
+            print("✅ MessageDedupCache: Connected to Redis.")
+        except Exception as e:
+            print(f"⚠️ MessageDedupCache: Redis unreachable ({e}). Using RAM fallback.")
+            self.redis_available = False
+
+        self.ttl = settings.WEBHOOK_DEDUP_TTL
+        self.pending_ttl = settings.WEBHOOK_DEDUP_PENDING_TTL
+        self.wait_seconds = settings.WEBHOOK_DEDUP_WAIT_SECONDS
+        self.poll_interval = 0.25
+
+        # RAM fallback: key -> (value, expires_at)
+        self._memory_store = {}
+        self._next_prune = 0.0
+        # Local waiters so duplicates on the same worker don't need to poll Redis
+        self._local_events = {}
+
+        self.stats = {
+            "processed": 0,        # First deliveries handled by the orchestrator
+            "hits_completed": 0,   # Retries answered from cache
+            "hits_inflight": 0,    # Retries that waited for the first delivery
+            "wait_timeouts": 0,    # Retries that gave up waiting
+        }
+
+    def _key(self, message_sid: str) -> str:
+        return f"webhook:sid:{message_sid}"
+
+    # --- Storage primitives (Redis first, RAM fallback) ---
+
+    def _claim(self, key: str) -> bool:
+        if self.redis_available:
+            try:
+                return bool(self.redis.set(key, PENDING_MARKER, nx=True, ex=self.pending_ttl))
+            except RedisError as e:
+                self._handle_redis_error(e)
+
+        value = self._ram_get(key)
+        if value is not None:
+            return False
+        self._prune_expired()
+        self._memory_store[key] = (PENDING_MARKER, time.monotonic() + self.pending_ttl)
+        return True
+
+    def _get(self, key: str):
+        if self.redis_available:
+            try:
+                return self.redis.get(key)
+            except RedisError as e:
+                self._handle_redis_error(e)
+        return self._ram_get(key)
+
+    def _store(self, key: str, twiml: str):
+        if self.redis_available:
+            try:
+                self.redis.setex(key, self.ttl, twiml)
+                self._memory_store.pop(key, None)  # Drop a RAM claim made before Redis came back
+                return
+            except RedisError as e:
+                self._handle_redis_error(e)
+        self._prune_expired()
+        self._memory_store[key] = (twiml, time.monotonic() + self.ttl)
+
+    def _prune_expired(self):
+        """RAM mode only: drop expired SIDs (they are otherwise only evicted when read again)."""
+        now = time.monotonic()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        for key in [k for k, (_, expires_at) in self._memory_store.items() if expires_at < now]:
+            del self._memory_store[key]
+
+    def _ram_get(self, key: str):
+        entry = self._memory_store.get(key)
+        if not entry:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            self._memory_store.pop(key, None)
+            return None
+        return value
+
+    def _handle_redis_error(self, e):
+        print(f"❌ Redis Error (dedup): {e}. Switching to RAM mode.")
+        self.redis_available = False
+
+    # --- Public API ---
+
+    async def acquire(self, message_sid: str):
+        """
+        Returns None if the caller owns this MessageSid and must process it.
+        Otherwise returns the TwiML to send back for the duplicate delivery.
+        """
+        key = self._key(message_sid)
+        if self._claim(key):
+            self._local_events[key] = asyncio.Event()
+            self.stats["processed"] += 1
+            return None
+
+        value = self._get(key)
+        if value and value != PENDING_MARKER:
+            self.stats["hits_completed"] += 1
+            print(f"♻️ Duplicate webhook {message_sid}: returning cached TwiML")
+            return value
+
+        print(f"⏳ Duplicate webhook {message_sid}: waiting for in-flight result")
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            event = self._local_events.get(key)
+            if event:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=deadline - time.monotonic())
+                except asyncio.TimeoutError:
+                    break
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+            value = self._get(key)
+            if value and value != PENDING_MARKER:
+                self.stats["hits_inflight"] += 1
+                return value
+            if value is None and self._claim(key):
+                # The original worker died and its claim expired: take over
+                self._local_events[key] = asyncio.Event()
+                self.stats["processed"] += 1
+                return None
+
+        self.stats["wait_timeouts"] += 1
+        print(f"⚠️ Duplicate webhook {message_sid}: timed out waiting, replying empty")
+        return EMPTY_TWIML
+
+    def complete(self, message_sid: str, twiml: str):
+        """Stores the final TwiML and wakes up any local duplicates."""
+        key = self._key(message_sid)
+        self._store(key, twiml)
+        event = self._local_events.pop(key, None)
+        if event:
+            event.set()
+
+# Global Instance
+dedup_cache = MessageDedupCache()
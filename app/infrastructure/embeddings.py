@@ -0,0 +1,82 @@
+import os
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+# EMBEDDING_BACKEND values
+BACKEND_HUGGINGFACE = "huggingface"  # sentence-transformers + PyTorch (default)
+BACKEND_ONNX = "onnx"                # int8 ONNX Runtime export of the same model (CPU only)
+
+
+class OnnxMiniLMEmbeddings(Embeddings):
+    """
+    all-MiniLM-L6-v2 on ONNX Runtime: same tokenizer, mean pooling and L2
+    normalization as the sentence-transformers pipeline, without PyTorch.
+    model_dir is produced by `python -m app.tools.export_onnx_embeddings`
+    (model_quantized.onnx + tokenizer.json).
+    """
+
+    def __init__(self, model_dir: str, max_length: int = 256, batch_size: int = 32, threads: int = 0):
+        # Optional dependencies: only needed when EMBEDDING_BACKEND=onnx
+        import numpy as np
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self._np = np
+        self.batch_size = batch_size
+
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")  # Unquantized export
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"No ONNX model in {model_dir}: build the image with --build-arg EMBEDDING_BACKEND=onnx "
+                f"or run `python -m app.tools.export_onnx_embeddings`"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.model_path = model_path
+
+    def _embed(self, texts: list) -> list:
+        np = self._np
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+            token_embeddings = self.session.run(None, feeds)[0]  # (batch, tokens, 384)
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts: list) -> list:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> list:
+        return self._embed([text])[0]
+
+
+def build_embeddings(backend: str | None = None) -> Embeddings:
+    """Embedding model for FAISS. Imports are lazy so the ONNX image can ship without PyTorch."""
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == BACKEND_ONNX:
+        return OnnxMiniLMEmbeddings(settings.ONNX_EMBEDDING_MODEL_DIR, threads=settings.ONNX_EMBEDDING_THREADS)
+    if backend == BACKEND_HUGGINGFACE:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
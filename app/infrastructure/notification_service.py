@@ -1,6 +1,7 @@
 from twilio.rest import Client
 import logging
 from app.core.config import settings
+from app.infrastructure.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +22,10 @@ class NotificationService:
         else:
             print("⚠️ NotificationService: Credentials missing in .env. Notifications disabled.")
 
-    def notify_admin_new_order(self, user_phone: str, items: list):
-        """Sends a WhatsApp message to the Admin."""
-        if not self.enabled or not settings.ADMIN_PHONE_NUMBER:
+    def notify_admin_new_order(self, user_phone: str, items: list, admin_phone: str = None):
+        """Sends a WhatsApp message to the Admin (the tenant's admin if given)."""
+        admin_phone = admin_phone or settings.ADMIN_PHONE_NUMBER
+        if not self.enabled or not admin_phone:
             print("⚠️ NotificationService disabled or Admin number missing.")
             return
 
@@ -39,14 +41,15 @@ class NotificationService:
         try:
             # Twilio requires the "whatsapp:" prefix
             from_number = f"whatsapp:{settings.TWILIO_FROM_NUMBER}" if "whatsapp:" not in settings.TWILIO_FROM_NUMBER else settings.TWILIO_FROM_NUMBER
-            to_number = f"whatsapp:{settings.ADMIN_PHONE_NUMBER}" if "whatsapp:" not in settings.ADMIN_PHONE_NUMBER else settings.ADMIN_PHONE_NUMBER
+            to_number = f"whatsapp:{admin_phone}" if "whatsapp:" not in admin_phone else admin_phone
 
-            self.client.messages.create(
-                from_=from_number,
-                body=message_body,
-                to=to_number
-            )
-            print(f"✅ Admin Notification Sent to {settings.ADMIN_PHONE_NUMBER}")
+            with tracer.span("twilio.send"):
+                self.client.messages.create(
+                    from_=from_number,
+                    body=message_body,
+                    to=to_number
+                )
+            print(f"✅ Admin Notification Sent to {admin_phone}")
         except Exception as e:
             logger.error(f"❌ Failed to send Admin Notification: {e}")
             print(f"❌ Notification Failed: {e}")
\ No newline at end of file
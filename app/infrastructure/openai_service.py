@@ -1,8 +1,9 @@
+import asyncio
 import json
 import os
 import re
+from collections import OrderedDict
 from langchain_openai import ChatOpenAI
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import CharacterTextSplitter
@@ -10,10 +11,26 @@ from langchain_core.messages import SystemMessage, HumanMessage
 
 from app.core.config import settings
 # We import the NEW prompt from domain
-from app.domain.prompts import SYSTEM_PROMPT, INTENT_PROMPT, EXTRACTION_PROMPT
+from app.domain.prompts import SYSTEM_PROMPT, INTENT_PROMPT, EXTRACTION_PROMPT, SUMMARY_PROMPT
 from app.interfaces.IAiService import IAiService
+from app.infrastructure.tracing import tracer
+from app.infrastructure.embeddings import build_embeddings
+from app.domain.tenant import Tenant, DEFAULT_TENANT
+
+
+def split_menu(menu_path: str) -> list:
+    """Menu markdown -> RAG chunks (also used by app/tools/benchmark_embeddings.py)."""
+    documents = TextLoader(menu_path).load()
+    return CharacterTextSplitter(chunk_size=500, chunk_overlap=0).split_documents(documents)
+
 
 class OpenAIService(IAiService):
+    """
+    Shared LLM gateway + embedding model for every tenant.
+    Each tenant's catalog gets its own FAISS shard, loaded on first use and
+    evicted least-recently-used beyond MAX_LOADED_MENU_SHARDS.
+    """
+
     def __init__(self):
         self.llm = ChatOpenAI(
             model="deepseek-chat", 
@@ -23,62 +40,91 @@ class OpenAIService(IAiService):
             max_tokens=1024
         )
         
-        print("⏳ Loading local embeddings model...")
-        self.embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        print(f"⏳ Loading local embeddings model ({settings.EMBEDDING_BACKEND})...")
+        self.embeddings = build_embeddings()
         print("✅ Local embeddings loaded.")
         
-        self.vector_store = None
-        self._initialize_vector_store()
+        self.max_shards = settings.MAX_LOADED_MENU_SHARDS
+        self._shards = OrderedDict()  # menu_path -> FAISS (or None if unavailable)
+        self._shard_locks = {}
+        # Warm the default shop's index at startup (as before)
+        self._shards[DEFAULT_TENANT.menu_path] = self._build_vector_store(DEFAULT_TENANT.menu_path)
 
-    def _initialize_vector_store(self):
+    def _build_vector_store(self, menu_path: str):
         try:
-            if not os.path.exists("data/menu.md"):
-                print("⚠️ Warning: data/menu.md not found. Skipping RAG.")
-                return
-
-            loader = TextLoader("data/menu.md")
-            documents = loader.load()
-            text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=0)
-            docs = text_splitter.split_documents(documents)
-            self.vector_store = FAISS.from_documents(docs, self.embeddings)
-            print("✅ RAG Knowledge Base Loaded: menu.md")
+            if not os.path.exists(menu_path):
+                print(f"⚠️ Warning: {menu_path} not found. Skipping RAG.")
+                return None
+
+            docs = split_menu(menu_path)
+            vector_store = FAISS.from_documents(docs, self.embeddings)
+            print(f"✅ RAG Knowledge Base Loaded: {menu_path}")
+            return vector_store
         except Exception as e:
-            print(f"⚠️ Warning: Could not load menu.md. Error: {e}")
+            print(f"⚠️ Warning: Could not load {menu_path}. Error: {e}")
+            return None
 
-    async def get_intent(self, user_message: str) -> str:
+    async def _get_vector_store(self, tenant: Tenant | None):
+        """Lazily loads the tenant's FAISS shard (LRU cache shared by all tenants)."""
+        menu_path = (tenant or DEFAULT_TENANT).menu_path
+        if menu_path in self._shards:
+            self._shards.move_to_end(menu_path)
+            return self._shards[menu_path]
+
+        lock = self._shard_locks.setdefault(menu_path, asyncio.Lock())
+        async with lock:
+            if menu_path not in self._shards:
+                with tracer.span("faiss.load_shard", menu_path=menu_path):
+                    # Embedding a catalog is CPU work: keep the event loop free
+                    self._shards[menu_path] = await asyncio.to_thread(self._build_vector_store, menu_path)
+                while len(self._shards) > self.max_shards:
+                    evicted, _ = self._shards.popitem(last=False)
+                    print(f"♻️ RAG shard evicted (LRU): {evicted}")
+        self._shards.move_to_end(menu_path)
+        return self._shards[menu_path]
+
+    async def get_intent(self, user_message: str, tenant: Tenant = None) -> str:
         messages = [HumanMessage(content=INTENT_PROMPT.format(message=user_message))]
-        response = await self.llm.ainvoke(messages)
+        with tracer.span("llm.get_intent"):
+            response = await self.llm.ainvoke(messages)
         return response.content.strip().lower()
 
-    async def generate_response(self, user_message: str, intent: str, history: str = "") -> str:
+    async def generate_response(self, user_message: str, intent: str, history: str = "", tenant: Tenant = None) -> str:
         context = ""
-        if intent in ["menu_query", "order_intent"] and self.vector_store:
-            docs = self.vector_store.similarity_search(user_message, k=2)
+        vector_store = await self._get_vector_store(tenant) if intent in ["menu_query", "order_intent"] else None
+        if vector_store:
+            with tracer.span("faiss.search", k=2):
+                docs = vector_store.similarity_search(user_message, k=2)
             context = "\n".join([d.page_content for d in docs])
         
-        full_system_prompt = SYSTEM_PROMPT.format(context=context) + f"\n\nCONVERSATION HISTORY:\n{history}"
+        system_prompt = (tenant.system_prompt if tenant and tenant.system_prompt else SYSTEM_PROMPT)
+        full_system_prompt = system_prompt.format(context=context) + f"\n\nCONVERSATION HISTORY:\n{history}"
         
         messages = [
             SystemMessage(content=full_system_prompt),
             HumanMessage(content=user_message)
         ]
-        response = await self.llm.ainvoke(messages)
+        with tracer.span("llm.generate_response", intent=intent):
+            response = await self.llm.ainvoke(messages)
         return response.content
 
-    async def extract_order_items(self, user_message: str, history: str = "") -> dict:
+    async def extract_order_items(self, user_message: str, history: str = "", tenant: Tenant = None) -> dict:
         """
         Returns a DICT with items, modifiers, and delivery info.
         """
         context = ""
-        if self.vector_store:
-            docs = self.vector_store.similarity_search(user_message, k=3)
+        vector_store = await self._get_vector_store(tenant)
+        if vector_store:
+            with tracer.span("faiss.search", k=3):
+                docs = vector_store.similarity_search(user_message, k=3)
             context = "\n".join([d.page_content for d in docs])
 
         combined_context = f"{context}\n\nRECENT CHAT:\n{history}"
         prompt_content = EXTRACTION_PROMPT.format(context=combined_context, user_input=user_message)
         
         try:
-            response = await self.llm.ainvoke([HumanMessage(content=prompt_content)])
+            with tracer.span("llm.extract_order_items"):
+                response = await self.llm.ainvoke([HumanMessage(content=prompt_content)])
             cleaned_json = self._clean_json_response(response.content)
             data = json.loads(cleaned_json)
             
@@ -92,6 +138,13 @@ class OpenAIService(IAiService):
             print(f"❌ Extraction Error: {e}")
             return {"items": [], "modifiers": {}, "delivery_info": {}}
 
+    async def summarize_conversation(self, summary: str, messages: str, tenant: Tenant = None) -> str:
+        """Folds messages that left the prompt window into the rolling summary."""
+        prompt_content = SUMMARY_PROMPT.format(summary=summary or "(vacío)", messages=messages)
+        with tracer.span("llm.summarize_conversation"):
+            response = await self.llm.ainvoke([HumanMessage(content=prompt_content)])
+        return response.content.strip()
+
     def _clean_json_response(self, text: str) -> str:
         text = text.strip()
         if text.startswith("```"):
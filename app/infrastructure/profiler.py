@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Only one profiling session at a time (sampling is process-wide)
+_profile_lock = threading.Lock()
+
+# Leaf frames of a thread that is blocked, not running: the event loop waiting in
+# select, thread pool / recorder workers waiting on their queue, joins.
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # concurrent.futures worker blocked on its (C) SimpleQueue
+    ("threading.py", "wait"),
+    ("threading.py", "join"),
+    ("threading.py", "_wait_for_tstate_lock"),
+}
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_profile(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sampling profiler: snapshots every thread's stack every `interval` seconds.
+    Samples are wall-clock (Python can't tell on-CPU from GIL waits), so threads
+    parked in an idle wait are skipped; what remains approximates CPU work.
+    Returns "folded" stacks (root;...;leaf count), the input format of
+    flamegraph.pl, speedscope and inferno. Costs nothing when not running.
+    Raises RuntimeError if another session is already running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profiling session is already running")
+
+    try:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me or _is_idle(frame):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(interval)
+
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+    finally:
+        _profile_lock.release()
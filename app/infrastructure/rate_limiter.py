@@ -0,0 +1,276 @@
+import time
+import redis
+from redis.exceptions import RedisError
+from app.core.config import settings
+
+# Decisions returned by RateLimiter.check()
+ALLOWED = "allowed"
+LIMITED_PHONE = "limited_phone"    # This sender exceeded its bucket
+LIMITED_GLOBAL = "limited_global"  # All senders together exceeded the global bucket
+BLOCKED = "blocked"                # Sender is on the runtime block list
+
+# Both buckets are refilled and charged in one atomic step (one round trip, shared by all workers).
+# Returns 0 = allowed, 1 = phone bucket empty, 2 = global bucket empty.
+_TOKEN_BUCKET_LUA = """
+local function refill(key, capacity, rate, now)
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * rate)
+end
+
+local now = tonumber(ARGV[5])
+local phone = refill(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]), now)
+local global = refill(KEYS[2], tonumber(ARGV[3]), tonumber(ARGV[4]), now)
+
+local result = 0
+if phone < 1 then
+    result = 1
+elseif global < 1 then
+    result = 2
+else
+    phone = phone - 1
+    global = global - 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', phone, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[1]) / tonumber(ARGV[2])) + 60)
+redis.call('HSET', KEYS[2], 'tokens', global, 'ts', now)
+redis.call('EXPIRE', KEYS[2], math.ceil(tonumber(ARGV[3]) / tonumber(ARGV[4])) + 60)
+return result
+"""
+
+
+class RateLimiter:
+    """
+    Spam protection in front of the orchestrator (checked before any LLM work).
+    - Token bucket per sender (per shop) + one global bucket, stored in Redis so
+      every worker shares them. RAM fallback if Redis is down.
+    - Runtime block list (Redis keys, optional expiry) managed from /admin/blocklist.
+      Senders that keep hitting their limit are blocked automatically for a while.
+    """
+
+    def __init__(self):
+        try:
+            self.redis = redis.from_url(
+                settings.REDIS_URL,
+                decode_responses=True,
+                socket_connect_timeout=1
+            )
+            self.redis.ping()
+            self.redis_available = True
+            self._bucket_script = self.redis.register_script(_TOKEN_BUCKET_LUA)
+            print("✅ RateLimiter: Connected to Redis.")
+        except Exception as e:
+            print(f"⚠️ RateLimiter: Redis unreachable ({e}). Using RAM fallback.")
+            self.redis_available = False
+
+        self.phone_capacity = settings.RATE_LIMIT_PHONE_CAPACITY
+        self.phone_rate = settings.RATE_LIMIT_PHONE_REFILL_PER_MINUTE / 60
+        self.global_capacity = settings.RATE_LIMIT_GLOBAL_CAPACITY
+        self.global_rate = settings.RATE_LIMIT_GLOBAL_REFILL_PER_MINUTE / 60
+
+        # RAM fallback
+        self._buckets = {}   # key -> [tokens, ts]
+        self._memory_store = {}  # key -> (value, expires_at or None)
+        self._next_prune = 0.0
+
+        self.stats = {ALLOWED: 0, LIMITED_PHONE: 0, LIMITED_GLOBAL: 0, BLOCKED: 0,
+                      "auto_blocked": 0, "polite_replies": 0}
+
+    def _handle_redis_error(self, e):
+        print(f"❌ Redis Error (rate limiter): {e}. Switching to RAM mode.")
+        self.redis_available = False
+
+    # --- Token buckets ---
+
+    def _take_token(self, phone_key: str) -> int:
+        now = time.time()
+        if self.redis_available:
+            try:
+                return int(self._bucket_script(
+                    keys=[f"ratelimit:bucket:{phone_key}", "ratelimit:bucket:__global__"],
+                    args=[self.phone_capacity, self.phone_rate, self.global_capacity, self.global_rate, now]
+                ))
+            except RedisError as e:
+                self._handle_redis_error(e)
+
+        self._prune_ram(now)
+        phone = self._ram_refill(phone_key, self.phone_capacity, self.phone_rate, now)
+        glob = self._ram_refill("__global__", self.global_capacity, self.global_rate, now)
+        if phone[0] < 1:
+            return 1
+        if glob[0] < 1:
+            return 2
+        phone[0] -= 1
+        glob[0] -= 1
+        return 0
+
+    def _prune_ram(self, now):
+        """
+        RAM mode only, at most once a minute: forget sender buckets that have refilled
+        to capacity (a fresh bucket is identical) and expired flags / counters.
+        """
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        for key in [k for k, (tokens, ts) in self._buckets.items()
+                    if k != "__global__" and tokens + (now - ts) * self.phone_rate >= self.phone_capacity]:
+            del self._buckets[key]
+        mono = time.monotonic()
+        for key in [k for k, (_, expires_at) in self._memory_store.items()
+                    if expires_at is not None and expires_at < mono]:
+            del self._memory_store[key]
+
+    def _ram_refill(self, key, capacity, rate, now):
+        bucket = self._buckets.setdefault(key, [capacity, now])
+        bucket[0] = min(capacity, bucket[0] + max(0.0, now - bucket[1]) * rate)
+        bucket[1] = now
+        return bucket
+
+    # --- Small keyed counters / flags (Redis first, RAM fallback) ---
+
+    def _ram_get(self, key):
+        entry = self._memory_store.get(key)
+        if not entry:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            self._memory_store.pop(key, None)
+            return None
+        return value
+
+    def _ram_set(self, key, value, ttl):
+        self._memory_store[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    def _set_once(self, key: str, ttl: int) -> bool:
+        """SET NX: True only for the first caller within ttl."""
+        if self.redis_available:
+            try:
+                return bool(self.redis.set(key, "1", nx=True, ex=ttl))
+            except RedisError as e:
+                self._handle_redis_error(e)
+        if self._ram_get(key) is not None:
+            return False
+        self._ram_set(key, "1", ttl)
+        return True
+
+    def _incr(self, key: str, ttl: int) -> int:
+        if self.redis_available:
+            try:
+                count = self.redis.incr(key)
+                if count == 1:
+                    self.redis.expire(key, ttl)
+                return count
+            except RedisError as e:
+                self._handle_redis_error(e)
+        count = int(self._ram_get(key) or 0) + 1
+        expires_at = (self._memory_store.get(key) or (None, None))[1]
+        self._memory_store[key] = (count, expires_at or time.monotonic() + ttl)
+        return count
+
+    # --- Block list ---
+
+    def _block_key(self, phone: str) -> str:
+        return f"ratelimit:block:{phone}"
+
+    def is_blocked(self, phone: str) -> bool:
+        key = self._block_key(phone)
+        if self.redis_available:
+            try:
+                return bool(self.redis.exists(key))
+            except RedisError as e:
+                self._handle_redis_error(e)
+        return self._ram_get(key) is not None
+
+    def block(self, phone: str, reason: str = "manual", ttl: int | None = None):
+        key = self._block_key(phone)
+        if self.redis_available:
+            try:
+                self.redis.set(key, reason, ex=ttl)
+            except RedisError as e:
+                self._handle_redis_error(e)
+        self._ram_set(key, reason, ttl)
+        print(f"⛔ RateLimiter: Blocked {phone} ({reason}, ttl={ttl or 'none'})")
+
+    def unblock(self, phone: str):
+        key = self._block_key(phone)
+        if self.redis_available:
+            try:
+                self.redis.delete(key)
+            except RedisError as e:
+                self._handle_redis_error(e)
+        self._memory_store.pop(key, None)
+        print(f"✅ RateLimiter: Unblocked {phone}")
+
+    def blocked_numbers(self) -> dict:
+        """phone -> {"reason", "ttl"} for every blocked sender."""
+        prefix = self._block_key("")
+        if self.redis_available:
+            try:
+                result = {}
+                for key in self.redis.scan_iter(match=f"{prefix}*", count=500):
+                    result[key[len(prefix):]] = {"reason": self.redis.get(key), "ttl": self.redis.ttl(key)}
+                return result
+            except RedisError as e:
+                self._handle_redis_error(e)
+        now = time.monotonic()
+        return {
+            key[len(prefix):]: {"reason": value, "ttl": round(expires_at - now) if expires_at else -1}
+            for key, (value, expires_at) in list(self._memory_store.items())
+            if key.startswith(prefix) and self._ram_get(key) is not None
+        }
+
+    # --- Public API ---
+
+    def check(self, phone: str, tenant=None) -> str:
+        """Decision for one inbound message (consumes a token when allowed)."""
+        if self.is_blocked(phone):
+            self.stats[BLOCKED] += 1
+            return BLOCKED
+
+        phone_key = tenant.session_key(phone) if tenant else phone
+        result = self._take_token(phone_key)
+        if result == 0:
+            self.stats[ALLOWED] += 1
+            return ALLOWED
+
+        decision = LIMITED_PHONE if result == 1 else LIMITED_GLOBAL
+        self.stats[decision] += 1
+        print(f"🚫 RateLimiter: {phone} {decision}")
+
+        if decision == LIMITED_PHONE and settings.RATE_LIMIT_AUTOBLOCK_STRIKES:
+            strikes = self._incr(f"ratelimit:strikes:{phone}", settings.RATE_LIMIT_AUTOBLOCK_WINDOW_SECONDS)
+            if strikes >= settings.RATE_LIMIT_AUTOBLOCK_STRIKES:
+                self.block(phone, reason="auto: flooding", ttl=settings.RATE_LIMIT_AUTOBLOCK_SECONDS)
+                self.stats["auto_blocked"] += 1
+        return decision
+
+    def limited_reply(self, phone: str, decision: str = LIMITED_PHONE) -> str:
+        """
+        Polite reply for a limited sender, at most once per cooldown (replying to
+        every flooded message would cost as much as answering it). "" = silent drop.
+        Under the global limit the sender did nothing wrong, so they get the "busy" reply.
+        """
+        reply = settings.RATE_LIMIT_GLOBAL_REPLY if decision == LIMITED_GLOBAL else settings.RATE_LIMIT_REPLY
+        if settings.RATE_LIMIT_ACTION != "reply" or not reply:
+            return ""
+        if not self._set_once(f"ratelimit:notified:{phone}", settings.RATE_LIMIT_REPLY_COOLDOWN_SECONDS):
+            return ""
+        self.stats["polite_replies"] += 1
+        return reply
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": "redis" if self.redis_available else "ram",
+            "limits": {
+                "phone_capacity": self.phone_capacity,
+                "phone_refill_per_minute": settings.RATE_LIMIT_PHONE_REFILL_PER_MINUTE,
+                "global_capacity": self.global_capacity,
+                "global_refill_per_minute": settings.RATE_LIMIT_GLOBAL_REFILL_PER_MINUTE,
+            },
+            **self.stats,
+        }
+
+# Global Instance
+rate_limiter = RateLimiter()
@@ -4,14 +4,20 @@ from sqlalchemy import desc # <-- Added for sorting
 from app.interfaces.IOrderRepository import IOrderRepository
 from app.domain.models import Order
 from app.infrastructure.database import SessionLocal
+from app.domain.tenant import DEFAULT_TENANT_ID
 
 class PostgresOrderRepository(IOrderRepository):
 
-    def save_order(self, user_phone: str, items: List[dict], total_price: str = "Pending") -> bool:
+    def __init__(self, publisher=None):
+        self.publisher = publisher # Optional DashboardPublisher (live admin updates)
+
+    def save_order(self, user_phone: str, items: List[dict], total_price: str = "Pending",
+                   tenant_id: str = DEFAULT_TENANT_ID) -> bool:
         session = SessionLocal()
         try:
             # SQLAlchemy handles list-of-dicts if column is JSONB, otherwise dump to string
             new_order = Order(
+                tenant_id=tenant_id,
                 user_phone=user_phone,
                 items=items, 
                 status="confirmed",
@@ -19,22 +25,53 @@ class PostgresOrderRepository(IOrderRepository):
             )
             session.add(new_order)
             session.commit()
-            return True
         except Exception as e:
             print(f"❌ DB Error: {e}")
             session.rollback()
+            session.close()
             return False
+
+        # The order is saved: a dashboard failure must not report it as failed (retries would duplicate it)
+        try:
+            if self.publisher:
+                session.refresh(new_order) # Load id / created_at for the dashboard
+                self.publisher.publish_order(new_order)
+        except Exception as e:
+            print(f"⚠️ Dashboard publish failed for saved order: {e}")
+            self.publisher.invalidate(tenant_id)  # Don't keep serving a snapshot without this order
+        finally:
+            session.close()
+        return True
+
+    def get_recent_orders(self, user_phone: str, tenant_id: str = DEFAULT_TENANT_ID, limit: int = 3) -> List[dict]:
+        """Latest confirmed orders of one customer at one shop (uses ix_orders_tenant_user_phone_created_at)."""
+        session = SessionLocal()
+        try:
+            orders = (
+                session.query(Order)
+                .filter(Order.tenant_id == tenant_id, Order.user_phone == user_phone, Order.status == "confirmed")
+                .order_by(desc(Order.created_at), desc(Order.id))
+                .limit(limit)
+                .all()
+            )
+            return [{"id": o.id, "items": o.items, "created_at": o.created_at} for o in orders]
+        except Exception as e:
+            print(f"❌ DB Read Error: {e}")
+            return []
         finally:
             session.close()
 
-    def get_all_orders(self, limit: int = 50) -> List[Order]:
+    def get_all_orders(self, limit: int = 50, tenant_id: str | None = None) -> List[Order]:
         """
-        Retrieves the latest orders from the database.
+        Retrieves the latest orders from the database (one shop's if tenant_id is given).
         Ordered by created_at DESC (Newest first).
         """
         session = SessionLocal()
         try:
-            orders = session.query(Order).order_by(desc(Order.created_at)).limit(limit).all()
+            query = session.query(Order)
+            if tenant_id:
+                query = query.filter(Order.tenant_id == tenant_id)
+            orders = query.order_by(desc(Order.created_at)).limit(limit).all()
             return orders
         except Exception as e:
             print(f"❌ DB Read Error: {e}")
@@ -0,0 +1,111 @@
+import json
+import os
+import re
+import time
+import unicodedata
+from app.core.config import settings
+
+# Shipped with the repo; used when RULES_PATH points elsewhere and is missing
+BUNDLED_RULES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "data", "rules.json")
+
+_NON_WORD = re.compile(r"[^\w]+|_")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents ('Sí' -> 'si') and collapse punctuation/whitespace."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+class CompiledRules:
+    """
+    All 'contains' phrases compiled into ONE regex (one named lookahead group per
+    phrase, tried at every word start), plus a dict for whole-message ('exact') rules.
+    Lookaheads don't consume text, so overlapping phrases ("que hay" / "hay") all
+    match: a single finditer pass returns every rule that matches.
+    """
+
+    def __init__(self, rules: list):
+        self.exact = {}          # normalized message -> {rule names}
+        phrase_rules = {}        # regex fragment -> {rule names}
+
+        for rule in rules:
+            for phrase in rule.get("phrases", []):
+                is_prefix = phrase.strip().endswith("*")
+                norm = normalize(phrase)
+                if not norm:
+                    continue
+                if rule.get("match") == "exact":
+                    self.exact.setdefault(norm, set()).add(rule["name"])
+                    continue
+                fragment = re.escape(norm) + (r"\w*" if is_prefix else "")
+                phrase_rules.setdefault(fragment, set()).add(rule["name"])
+
+        fragments = list(phrase_rules)
+        self.group_rules = [phrase_rules[fragment] for fragment in fragments]  # By group index - 1
+        parts = [f"(?=(?P<p{idx}>{fragment})(?!\\w))?" for idx, fragment in enumerate(fragments)]
+        self.pattern = re.compile(r"(?<!\w)(?:" + "".join(parts) + ")") if parts else None
+
+    def match(self, text: str) -> set:
+        norm = normalize(text)
+        hits = set(self.exact.get(norm, ()))
+        if self.pattern:
+            for m in self.pattern.finditer(norm):
+                if m.lastindex:  # At least one phrase starts at this word
+                    for idx, value in enumerate(m.groups()):
+                        if value is not None:
+                            hits |= self.group_rules[idx]
+        return hits
+
+
+class RuleEngine:
+    """Loads keyword rules from RULES_PATH and hot-reloads them when the file changes."""
+
+    def __init__(self, path: str, reload_seconds: float = 5.0):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._mtime = None
+        self._last_check = 0.0
+        self.compiled = CompiledRules([])
+        self._reload_if_changed(force=True)
+        if self._mtime is None and os.path.exists(BUNDLED_RULES_PATH):
+            self.compiled = CompiledRules(self._load(BUNDLED_RULES_PATH))
+            print(f"✅ RuleEngine: Using bundled rules ({os.path.normpath(BUNDLED_RULES_PATH)})")
+
+    def _reload_if_changed(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_seconds:
+            return
+        self._last_check = now
+
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if force:
+                print(f"⚠️ RuleEngine: {self.path} not found.")
+            return
+        if mtime == self._mtime:
+            return
+
+        try:
+            rules = self._load(self.path)
+            # Compile first, swap after: a broken file never replaces working rules
+            self.compiled = CompiledRules(rules)
+            self._mtime = mtime
+            print(f"✅ RuleEngine: Loaded {len(rules)} rules from {self.path}")
+        except Exception as e:
+            self._mtime = mtime
+            print(f"❌ RuleEngine: Could not load {self.path} ({e}). Keeping previous rules.")
+
+    def _load(self, path: str) -> list:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["rules"]
+
+    def match(self, text: str) -> set:
+        """Returns the names of every rule that matches the message."""
+        self._reload_if_changed()
+        return self.compiled.match(text)
+
+# Global Instance
+rule_engine = RuleEngine(settings.RULES_PATH, settings.RULES_RELOAD_SECONDS)
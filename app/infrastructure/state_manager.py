@@ -2,12 +2,15 @@ import json
 import redis
 from redis.exceptions import ConnectionError, TimeoutError, RedisError
 from app.core.config import settings
+from app.infrastructure.tracing import traced
 
 # Define our States
 STATE_IDLE = "IDLE"
 STATE_ORDERING = "ORDERING"
 STATE_CONFIRMING = "CONFIRMING"
 
+HISTORY_WINDOW = 6  # Raw messages kept per session
+
 class StateManager:
     def __init__(self):
         # 1. Primary Memory (Redis)
@@ -29,6 +32,7 @@ class StateManager:
         self._memory_store = {}
         self.ttl = 3600  # Sessions expire after 1 hour
 
+    @traced("redis.get_state")
     def get_state(self, user_id: str) -> str:
         """Get user's current state. Default to IDLE."""
         key = f"user:{user_id}:state"
@@ -44,6 +48,7 @@ class StateManager:
         # Fallback to RAM
         return self._memory_store.get(key, STATE_IDLE)
 
+    @traced("redis.set_state")
     def set_state(self, user_id: str, new_state: str):
         """Update the user's state."""
         key = f"user:{user_id}:state"
@@ -58,6 +63,7 @@ class StateManager:
         # Always write to RAM (to keep sync in case Redis comes back and fails again)
         self._memory_store[key] = new_state
 
+    @traced("redis.get_context")
     def get_context(self, user_id: str) -> dict:
         """Get the temporary cart/order details."""
         key = f"user:{user_id}:context"
@@ -80,6 +86,7 @@ class StateManager:
         # For consistency with Redis logic, let's assume we store the object in RAM.
         return ram_data if ram_data else {"items": []}
 
+    @traced("redis.update_context")
     def update_context(self, user_id: str, updates: dict):
         """Merge new data into the existing context."""
         key = f"user:{user_id}:context"
@@ -100,6 +107,7 @@ class StateManager:
         # 3. Save to RAM (Store as dict for easier retrieval, or JSON for consistency)
         self._memory_store[key] = current
 
+    @traced("redis.clear_session")
     def clear_session(self, user_id: str):
         """Reset everything (after order is complete)."""
         state_key = f"user:{user_id}:state"
@@ -123,9 +131,11 @@ class StateManager:
 
 
        # --- NEW: CHAT HISTORY MANAGEMENT ---
+    @traced("redis.add_to_history")
     def add_to_history(self, user_id: str, role: str, content: str):
-        """Saves message to a sliding window list (Last 6 messages)."""
+        """Saves message to a sliding window list (Last 6 messages) and counts every message ever added."""
         key = f"user:{user_id}:history"
+        count_key = f"user:{user_id}:history_count"
         msg_entry = json.dumps({"role": role, "content": content})
         
         if self.redis_available:
@@ -133,8 +143,10 @@ class StateManager:
                 # Push to right, trim to keep last 6
                 pipe = self.redis.pipeline()
                 pipe.rpush(key, msg_entry)
-                pipe.ltrim(key, -6, -1) 
+                pipe.ltrim(key, -HISTORY_WINDOW, -1) 
                 pipe.expire(key, self.ttl)
+                pipe.incr(count_key)
+                pipe.expire(count_key, self.ttl)
                 pipe.execute()
             except RedisError:
                 pass # Fail silently for history
@@ -143,29 +155,67 @@ class StateManager:
         if key not in self._memory_store:
             self._memory_store[key] = []
         self._memory_store[key].append(msg_entry)
-        if len(self._memory_store[key]) > 6:
-            self._memory_store[key] = self._memory_store[key][-6:]
+        if len(self._memory_store[key]) > HISTORY_WINDOW:
+            self._memory_store[key] = self._memory_store[key][-HISTORY_WINDOW:]
+        self._memory_store[count_key] = self._memory_store.get(count_key, 0) + 1
 
-    def get_history(self, user_id: str) -> str:
-        """Returns formatted history string for the AI prompt."""
+    @traced("redis.get_history_window")
+    def get_history_window(self, user_id: str) -> tuple:
+        """(messages, total): the raw window as dicts + how many messages the session ever had."""
         key = f"user:{user_id}:history"
+        count_key = f"user:{user_id}:history_count"
         messages = []
+        total = None
         
         if self.redis_available:
             try:
-                messages = self.redis.lrange(key, 0, -1)
+                pipe = self.redis.pipeline()
+                pipe.lrange(key, 0, -1)
+                pipe.get(count_key)
+                messages, total = pipe.execute()
             except RedisError:
                 messages = self._memory_store.get(key, [])
         else:
             messages = self._memory_store.get(key, [])
 
+        if total is None:
+            total = self._memory_store.get(count_key, len(messages))
+        # Sessions from before the counter existed: count what is visible
+        total = max(int(total), len(messages))
+        return [json.loads(m) for m in messages], total
+
+    def get_history(self, user_id: str) -> str:
+        """Returns formatted history string for the AI prompt."""
+        messages, _ = self.get_history_window(user_id)
         # Format: "User: ... \n AI: ..."
-        formatted = []
-        for m in messages:
-            data = json.loads(m)
-            formatted.append(f"{data['role']}: {data['content']}")
-        
-        return "\n".join(formatted)
+        return format_history(messages)
+
+    # --- Rolling conversation memory (summary + cart facts, next to the history) ---
+    @traced("redis.get_memory")
+    def get_memory(self, user_id: str) -> dict:
+        key = f"user:{user_id}:memory"
+        if self.redis_available:
+            try:
+                data = self.redis.get(key)
+                if data:
+                    return json.loads(data)
+            except RedisError as e:
+                self._handle_redis_error(e)
+        return dict(self._memory_store.get(key) or {})
+
+    @traced("redis.set_memory")
+    def set_memory(self, user_id: str, memory: dict):
+        key = f"user:{user_id}:memory"
+        if self.redis_available:
+            try:
+                self.redis.setex(key, self.ttl, json.dumps(memory, ensure_ascii=False))
+            except RedisError as e:
+                self._handle_redis_error(e)
+        self._memory_store[key] = memory
+
+
+def format_history(messages: list) -> str:
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
 
 # Global Instance
 state_manager = StateManager()
\ No newline at end of file
@@ -0,0 +1,58 @@
+import json
+import os
+from app.core.config import settings
+from app.domain.tenant import Tenant, DEFAULT_TENANT
+
+
+def _normalize_number(number: str | None) -> str:
+    return (number or "").replace("whatsapp:", "").strip()
+
+
+class TenantRegistry:
+    """
+    Maps the receiving Twilio number to a Tenant.
+    Tenants come from TENANTS_PATH (JSON list); without it the deployment stays
+    single-tenant (DEFAULT_TENANT). Unknown numbers fall back to the default tenant.
+    """
+
+    def __init__(self, path: str | None):
+        self.default = DEFAULT_TENANT
+        self._by_id = {DEFAULT_TENANT.id: DEFAULT_TENANT}
+        self._by_number = {}
+
+        if path and os.path.exists(path):
+            self._load(path)
+        elif path:
+            print(f"⚠️ TenantRegistry: {path} not found. Single-tenant mode.")
+
+    def _load(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)["tenants"]
+
+        for entry in entries:
+            tenant = Tenant(**entry)
+            if tenant.id == DEFAULT_TENANT.id and "canned_replies" not in entry:
+                # The original shop keeps its built-in templates unless the file overrides them
+                tenant.canned_replies = dict(DEFAULT_TENANT.canned_replies)
+            if tenant.system_prompt_path and not tenant.system_prompt:
+                with open(tenant.system_prompt_path, encoding="utf-8") as f:
+                    tenant.system_prompt = f.read()
+            self._by_id[tenant.id] = tenant
+            if entry.get("default"):
+                self.default = tenant
+            for number in tenant.twilio_numbers:
+                self._by_number[_normalize_number(number)] = tenant
+
+        print(f"✅ TenantRegistry: Loaded {len(entries)} tenants from {path}")
+
+    def resolve(self, to_number: str | None) -> Tenant:
+        return self._by_number.get(_normalize_number(to_number), self.default)
+
+    def get(self, tenant_id: str | None) -> Tenant:
+        return self._by_id.get(tenant_id, self.default)
+
+    def all(self) -> list:
+        return list(self._by_id.values())
+
+# Global Instance
+tenant_registry = TenantRegistry(settings.TENANTS_PATH)
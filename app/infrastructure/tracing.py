@@ -0,0 +1,177 @@
+import contextvars
+import functools
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from app.core.config import settings
+
+# Active trace for the current turn (None = not tracing, spans are no-ops)
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class _NoopSpan:
+    """Shared do-nothing span: the only cost when tracing is off is one check."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "attrs", "start", "duration_ms", "_token")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        parent = _current_span.get()
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration_ms = 0.0
+        self._token = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration_ms = (time.perf_counter() - self.start) * 1000
+        _current_span.reset(self._token)
+        if exc_type:
+            self.attrs["error"] = repr(exc)
+        self.trace.spans.append(self)
+        return False
+
+    def set_attribute(self, key, value):
+        self.attrs[key] = value
+
+
+class Trace:
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.spans = []
+        self.root = Span(self, name, attrs)
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_trace.set(self)
+        self.root.__enter__()
+        return self.root
+
+    def __exit__(self, exc_type, exc, tb):
+        self.root.__exit__(exc_type, exc, tb)
+        _current_trace.reset(self._token)
+        self.tracer.export(self)
+        return False
+
+
+class Tracer:
+    """
+    Lightweight span tracing for webhook turns.
+    Each finished turn is written as one JSON line (trace + flat span list with
+    parent ids and offsets) to TRACE_EXPORT_PATH. Disabled when the path is unset.
+    Lines are queued and written by a background thread (no file I/O on the event loop).
+    """
+
+    def __init__(self, export_path: str | None, sample_rate: float = 1.0):
+        self.export_path = export_path
+        self.sample_rate = sample_rate
+        self.enabled = bool(export_path)
+        self._queue = queue.Queue()
+        self._writer = None
+        if self.enabled:
+            self._writer = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+            self._writer.start()
+            print(f"🔭 Tracer: Exporting turn traces to {export_path} (sample rate {sample_rate})")
+
+    def _write_loop(self):
+        with open(self.export_path, "a", encoding="utf-8") as f:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                try:
+                    f.write(line + "\n")
+                    if self._queue.empty():
+                        f.flush()  # Visible to tail -f without a flush per line under load
+                except Exception as e:
+                    print(f"❌ Tracer export error: {e}")
+
+    def close(self):
+        """Writes every queued trace, then closes the file (called on shutdown)."""
+        if self._writer:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def trace(self, name: str, **attrs):
+        """Root span for one turn (sampled)."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return _NOOP
+        return Trace(self, name, attrs)
+
+    def span(self, name: str, **attrs):
+        """Child span; no-op unless a sampled trace is active."""
+        if not self.enabled:
+            return _NOOP
+        trace = _current_trace.get()
+        if trace is None:
+            return _NOOP
+        return Span(trace, name, attrs)
+
+    def export(self, trace: Trace):
+        t0 = trace.root.start
+        record = {
+            "trace_id": trace.trace_id,
+            "name": trace.root.name,
+            "timestamp": trace.started_at,
+            "duration_ms": round(trace.root.duration_ms, 2),
+            "attrs": trace.root.attrs,
+            "spans": [
+                {
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "name": s.name,
+                    "offset_ms": round((s.start - t0) * 1000, 2),
+                    "duration_ms": round(s.duration_ms, 2),
+                    "attrs": s.attrs,
+                }
+                for s in sorted(trace.spans, key=lambda s: s.start) if s is not trace.root
+            ],
+        }
+        try:
+            self._queue.put(json.dumps(record, ensure_ascii=False, default=str))
+        except Exception as e:
+            print(f"❌ Tracer export error: {e}")
+
+# Global Instance
+tracer = Tracer(settings.TRACE_EXPORT_PATH, settings.TRACE_SAMPLE_RATE)
+
+
+def traced(name: str):
+    """Decorator for sync functions (e.g. StateManager Redis calls)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,133 @@
+import contextvars
+import gzip
+import json
+import queue
+import threading
+import time
+
+from app.interfaces.IAiService import IAiService
+from app.infrastructure.state_manager import state_manager
+
+# Turn currently being recorded (set per webhook request, read by RecordingAiService)
+_current_turn = contextvars.ContextVar("traffic_turn", default=None)
+
+
+class RecordingAiService(IAiService):
+    """
+    Wraps the real AI service and appends every LLM call (input, output, latency)
+    to the turn being recorded. Transparent when no turn is active.
+    """
+
+    def __init__(self, inner: IAiService):
+        self.inner = inner
+
+    def __getattr__(self, name):
+        # Expose the wrapped service's attributes (llm, vector_store, ...)
+        return getattr(self.inner, name)
+
+    async def get_intent(self, user_message: str, *args, **kwargs) -> str:
+        return await self._call("get_intent", self.inner.get_intent, user_message, *args, **kwargs)
+
+    async def generate_response(self, user_message: str, *args, **kwargs) -> str:
+        return await self._call("generate_response", self.inner.generate_response, user_message, *args, **kwargs)
+
+    async def extract_order_items(self, user_message: str, *args, **kwargs) -> dict:
+        return await self._call("extract_order_items", self.inner.extract_order_items, user_message, *args, **kwargs)
+
+    async def summarize_conversation(self, summary: str, *args, **kwargs) -> str:
+        # Background call (after the turn was written): passthrough, never replayed
+        return await self.inner.summarize_conversation(summary, *args, **kwargs)
+
+    async def _call(self, method, fn, user_message, *args, **kwargs):
+        start = time.perf_counter()
+        result = await fn(user_message, *args, **kwargs)
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.llm_calls.append({
+                "method": method,
+                "input": user_message,
+                "output": result,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+        return result
+
+
+class RecordedTurn:
+    def __init__(self, user_id: str, message: str, message_sid: str | None, tenant=None):
+        self.user_id = user_id
+        self.tenant_id = tenant.id if tenant else None
+        self.message = message
+        self.message_sid = message_sid
+        self.ts = time.time()
+        self.started = time.perf_counter()
+        self.state_key = tenant.session_key(user_id) if tenant else user_id
+        self.state_before = state_manager.get_state(self.state_key)
+        self.llm_calls = []
+        self.token = None
+
+
+class TrafficRecorder:
+    """
+    Opt-in recorder for /webhook/twilio. Writes one JSON line per turn to a
+    gzip file: inbound message, timing, state transition and LLM responses.
+    Lines are queued and written by a background thread (no file I/O on the
+    event loop, no per-line gzip flush); close() drains the queue.
+    Files contain customer phone numbers: treat them as production data.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue = queue.Queue()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._writer = threading.Thread(target=self._write_loop, name="traffic-recorder", daemon=True)
+        self._writer.start()
+        print(f"🎙️ TrafficRecorder: Recording webhook traffic to {path}")
+
+    def _write_loop(self):
+        while True:
+            line = self._queue.get()
+            if line is None:
+                break
+            try:
+                self._file.write(line + "\n")
+            except Exception as e:
+                print(f"❌ TrafficRecorder Error: {e}")
+        self._file.close()
+
+    def start_turn(self, user_id: str, message: str, message_sid: str | None = None,
+                   tenant=None) -> RecordedTurn:
+        turn = RecordedTurn(user_id, message, message_sid, tenant)
+        turn.token = _current_turn.set(turn)
+        return turn
+
+    def finish_turn(self, turn: RecordedTurn, response: str):
+        _current_turn.reset(turn.token)
+        record = {
+            "ts": turn.ts,
+            "user_id": turn.user_id,
+            "tenant_id": turn.tenant_id,
+            "message_sid": turn.message_sid,
+            "message": turn.message,
+            "response": response,
+            "state_before": turn.state_before,
+            "state_after": state_manager.get_state(turn.state_key),
+            "latency_ms": round((time.perf_counter() - turn.started) * 1000, 1),
+            "llm_calls": turn.llm_calls,
+        }
+        self._queue.put(json.dumps(record, ensure_ascii=False))
+
+    def close(self):
+        self._queue.put(None)  # Writes everything queued before it, then closes the file
+        self._writer.join()
+
+
+def load_recording(path: str) -> list:
+    """Reads a recording (gzip or plain JSONL) sorted by timestamp."""
+    opener = gzip.open if path.endswith(".gz") else open
+    records = []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return sorted(records, key=lambda r: r["ts"])
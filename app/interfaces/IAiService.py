@@ -1,15 +1,21 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import Dict, Any
 
 class IAiService(ABC):
+    # `tenant` (app.domain.tenant.Tenant) selects the shop's catalog & prompt; None = default shop
+
     @abstractmethod
-    async def get_intent(self, user_message: str) -> str:
+    async def get_intent(self, user_message: str, tenant=None) -> str:
         pass
 
     @abstractmethod
-    async def generate_response(self, user_message: str, intent: str) -> str:
+    async def generate_response(self, user_message: str, intent: str, history: str = "", tenant=None) -> str:
         pass
 
     @abstractmethod
-    async def extract_order_items(self, user_message: str) -> List[Dict[str, Any]]:
-        pass
\ No newline at end of file
+    async def extract_order_items(self, user_message: str, history: str = "", tenant=None) -> Dict[str, Any]:
+        pass
+
+    @abstractmethod
+    async def summarize_conversation(self, summary: str, messages: str, tenant=None) -> str:
+        pass
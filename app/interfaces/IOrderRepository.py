@@ -3,5 +3,10 @@ from typing import List, Dict
 
 class IOrderRepository(ABC):
     @abstractmethod
-    def save_order(self, user_phone: str, items: List[Dict], total_price: str) -> bool:
+    def save_order(self, user_phone: str, items: List[Dict], total_price: str, tenant_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_recent_orders(self, user_phone: str, tenant_id: str, limit: int = 3) -> List[Dict]:
+        """Customer's latest confirmed orders at one shop, newest first ({"id", "items", "created_at"})."""
         pass
\ No newline at end of file
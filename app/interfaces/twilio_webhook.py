@@ -2,6 +2,10 @@ from fastapi import APIRouter, Form, Request, HTTPException
 from fastapi.responses import Response
 import logging
 from xml.sax.saxutils import escape
+from app.infrastructure.dedup_cache import dedup_cache
+from app.infrastructure.tenant_registry import tenant_registry
+from app.infrastructure.rate_limiter import rate_limiter, ALLOWED, BLOCKED
+from app.core.config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -11,6 +15,8 @@ async def whatsapp_webhook(
     request: Request,
     From: str = Form(...),
     Body: str = Form(...),
+    To: str = Form(None),  # Receiving number: selects the tenant (shop)
+    MessageSid: str = Form(None),  # Idempotency key (Twilio retries reuse it)
     NumMedia: int = Form(0),  # NEW: Catch media count
     MediaContentType0: str = Form(None) # NEW: Catch media type
 ):
@@ -23,6 +29,7 @@ async def whatsapp_webhook(
     print(f"{'='*60}")
     print(f"From: {From}")
     print(f"Body: {Body}")
+    print(f"MessageSid: {MessageSid}")
     
     # ---------------------------------------------------------
     # 1. AUDIO / MEDIA GUARDRAIL (Added)
@@ -40,6 +47,15 @@ async def whatsapp_webhook(
             return Response(content=xml_response, media_type="application/xml")
     # ---------------------------------------------------------
 
+    # ---------------------------------------------------------
+    # 2. IDEMPOTENCY: Twilio retries reuse the same MessageSid
+    # ---------------------------------------------------------
+    if MessageSid:
+        cached_xml = await dedup_cache.acquire(MessageSid)
+        if cached_xml is not None:
+            return Response(content=cached_xml, media_type="application/xml")
+    # ---------------------------------------------------------
+
     try:
         # Log the incoming request for debugging
         logger.info(f"📨 Twilio Webhook: From={From}, Body={Body}")
@@ -52,17 +68,30 @@ async def whatsapp_webhook(
         # 2. Clean inputs (Twilio sends 'whatsapp:+12345')
         user_id = From.replace("whatsapp:", "")
         message_text = Body.strip()
+        tenant = tenant_registry.resolve(To)
+        print(f"✅ Tenant: {tenant.id} (To={To})")
         print(f"✅ Cleaned - user_id: {user_id}, message: {message_text}")
 
-        # 3. Process Logic
-        print(f"⏳ Processing message...")
-        response_text = await orchestrator.process_message(user_id, message_text)
+        # 3. RATE LIMIT / BLOCK LIST (before any LLM work; retries were already deduped above)
+        decision = rate_limiter.check(user_id, tenant) if settings.RATE_LIMIT_ENABLED else ALLOWED
+        if decision == ALLOWED:
+            # 4. Process Logic
+            print(f"⏳ Processing message...")
+            recorder = getattr(request.app.state, "traffic_recorder", None)
+            turn = recorder.start_turn(user_id, message_text, MessageSid, tenant) if recorder else None
+            response_text = await orchestrator.process_message(user_id, message_text, tenant=tenant)
+            if turn:
+                recorder.finish_turn(turn, response_text)
+        elif decision == BLOCKED:
+            response_text = ""
+        else:
+            response_text = rate_limiter.limited_reply(user_id, decision)
         print(f"✅ Got response_text: '{response_text}'")
         print(f"   Type: {type(response_text)}, Length: {len(response_text) if response_text else 0}")
         
         logger.info(f"✅ Response to {user_id}: {response_text}")
 
-        # 4. Return TwiML (XML) with properly escaped content
+        # 5. Return TwiML (XML) with properly escaped content
         # IMPORTANT: Special characters in response_text must be XML-escaped
         if response_text:
             escaped_text = escape(response_text)
@@ -81,6 +110,9 @@ async def whatsapp_webhook(
         print(f"✅ XML Response:")
         print(xml_response)
         print(f"{'='*60}\n")
+
+        if MessageSid:
+            dedup_cache.complete(MessageSid, xml_response)
         
         return Response(content=xml_response, media_type="application/xml")
 
@@ -90,4 +122,7 @@ async def whatsapp_webhook(
         import traceback
         traceback.print_exc()
         # Return empty response to stop Twilio retries in case of error
-        return Response(content="<Response></Response>", media_type="application/xml")
\ No newline at end of file
+        xml_response = "<Response></Response>"
+        if MessageSid:
+            dedup_cache.complete(MessageSid, xml_response)
+        return Response(content=xml_response, media_type="application/xml")
\ No newline at end of file
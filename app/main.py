@@ -1,20 +1,32 @@
+import asyncio
 import time
-from fastapi import FastAPI, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Form, Header, HTTPException, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse, PlainTextResponse
 from fastapi.requests import Request
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+from sqlalchemy import inspect, text
 from sqlalchemy.exc import OperationalError  # <-- Import this
 from app.core.config import settings
 
 # 1. Infrastructure & Domain Imports
 from app.domain.models import Order
+from app.domain.menu_catalog import MENU_DB
+from app.domain.tenant import DEFAULT_TENANT_ID
 from app.infrastructure.database import SessionLocal, engine, Base
 from app.infrastructure.openai_service import OpenAIService
 from app.infrastructure.repositories.order_repository import PostgresOrderRepository
 # NEW: Import Notification Service
 from app.infrastructure.notification_service import NotificationService
 from app.application.orchestrator import Orchestrator
+from app.infrastructure.dedup_cache import dedup_cache
+from app.infrastructure.traffic_recorder import TrafficRecorder, RecordingAiService
+from app.infrastructure.dashboard_publisher import dashboard_publisher
+from app.infrastructure.profiler import sample_profile
+from app.infrastructure.tenant_registry import tenant_registry
+from app.infrastructure.conversation_archive import conversation_archiver
+from app.infrastructure.rate_limiter import rate_limiter
+from app.infrastructure.tracing import tracer
 from app.interfaces import twilio_webhook
 
 app = FastAPI(title=settings.PROJECT_NAME)
@@ -31,6 +43,14 @@ for attempt in range(MAX_RETRIES):
     try:
         print(f"🔄 Attempting DB connection ({attempt + 1}/{MAX_RETRIES})...")
         Base.metadata.create_all(bind=engine)
+        # create_all skips existing tables: add columns / indexes introduced later
+        if "tenant_id" not in {c["name"] for c in inspect(engine).get_columns("orders")}:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE orders ADD COLUMN tenant_id VARCHAR"))
+                # Every order before multi-tenancy was taken by the original shop
+                conn.execute(text("UPDATE orders SET tenant_id = :tenant"), {"tenant": DEFAULT_TENANT_ID})
+        for index in Order.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
         print("✅ DB Connected and Tables Created.")
         break  # Success! Exit loop
     except OperationalError as e:
@@ -46,14 +66,22 @@ else:
 try:
     # 1. Initialize Services
     ai_service = OpenAIService()
-    order_repo = PostgresOrderRepository()
+    order_repo = PostgresOrderRepository(publisher=dashboard_publisher)
     notifier = NotificationService() # <--- NEW: Init Notifier
+
+    # Optional: record webhook traffic + LLM outputs for offline replay
+    traffic_recorder = None
+    if settings.TRAFFIC_RECORD_PATH:
+        traffic_recorder = TrafficRecorder(settings.TRAFFIC_RECORD_PATH)
+        ai_service = RecordingAiService(ai_service)
+    app.state.traffic_recorder = traffic_recorder
     
     # 2. Inject into Orchestrator
     orchestrator_instance = Orchestrator(
         ai_service=ai_service, 
         order_repo=order_repo,
-        notifier=notifier # <--- NEW: Pass to Orchestrator
+        notifier=notifier, # <--- NEW: Pass to Orchestrator
+        archiver=conversation_archiver if settings.ARCHIVE_ENABLED else None
     )
     
     app.state.orchestrator = orchestrator_instance
@@ -62,6 +90,26 @@ try:
 except Exception as e:
     print(f"❌ Error initializing services: {e}")
 
+@app.on_event("startup")
+async def start_conversation_archiver():
+    if settings.ARCHIVE_ENABLED:
+        conversation_archiver.start()
+
+@app.on_event("shutdown")
+async def stop_conversation_archiver():
+    if settings.ARCHIVE_ENABLED:
+        await conversation_archiver.stop()
+
+@app.on_event("shutdown")
+def close_traffic_recorder():
+    recorder = getattr(app.state, "traffic_recorder", None)
+    if recorder:
+        recorder.close()
+
+@app.on_event("shutdown")
+def close_tracer():
+    tracer.close()
+
 # Include Routers
 app.include_router(twilio_webhook.router)
 
@@ -75,32 +123,104 @@ def health_check():
     status = "active" if hasattr(app.state, "orchestrator") else "degraded"
     return {"status": status, "system": "Bakery Bot Orchestrator"}
 
+@app.get("/metrics")
+def metrics():
+    """Operational counters (JSON)."""
+    orchestrator = getattr(app.state, "orchestrator", None)
+    return {
+        "webhook_dedup": dedup_cache.stats,
+        "load_shedding": orchestrator.load_shedder.snapshot(is_open=tenant_registry.default.is_open()) if orchestrator else None,
+        "llm_scheduler": orchestrator.llm_scheduler.snapshot() if orchestrator else None,
+        "direct_answers": orchestrator.direct_answers.snapshot() if orchestrator else None,
+        "conversation_archive": conversation_archiver.snapshot(),
+        "reorder": orchestrator.recent_orders.snapshot() if orchestrator else None,
+        "conversation_memory": orchestrator.memory.snapshot() if orchestrator else None,
+        "rate_limiting": rate_limiter.snapshot(),
+        "tenants": {
+            t.id: {
+                "open": t.is_open(),
+                "tier": orchestrator.load_shedder.current_tier(is_open=t.is_open()) if orchestrator else None,
+            }
+            for t in tenant_registry.all()
+        },
+        "dashboard": {"subscribers": dashboard_publisher.subscriber_count, **dashboard_publisher.stats},
+    }
+
+def require_admin_token(x_admin_token: str = Header(None)):
+    """Guards admin debug endpoints. Disabled entirely if ADMIN_TOKEN is not configured."""
+    if not settings.ADMIN_TOKEN or x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin_token)])
+async def profile(seconds: int = 10):
+    """
+    Samples wall-clock stacks of every busy thread for N seconds (idle waits are
+    dropped; runs in a worker thread, so the event loop keeps serving and gets
+    profiled). Returns folded stacks:
+    curl -H "X-Admin-Token: ..." ".../admin/profile?seconds=30" | flamegraph.pl > out.svg
+    """
+    seconds = max(1, min(seconds, settings.PROFILE_MAX_SECONDS))
+    try:
+        folded = await asyncio.to_thread(sample_profile, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(folded, headers={"X-Profile-Clock": "wall (idle threads excluded)"})
+
+@app.get("/admin/blocklist", dependencies=[Depends(require_admin_token)])
+def list_blocked():
+    """Runtime block list (shared by every worker through Redis)."""
+    return rate_limiter.blocked_numbers()
+
+@app.post("/admin/blocklist", dependencies=[Depends(require_admin_token)])
+def block_number(phone: str = Form(...), reason: str = Form("manual"), ttl_seconds: int = Form(None)):
+    rate_limiter.block(phone.replace("whatsapp:", ""), reason=reason, ttl=ttl_seconds)
+    return {"blocked": phone}
+
+@app.delete("/admin/blocklist/{phone}", dependencies=[Depends(require_admin_token)])
+def unblock_number(phone: str):
+    rate_limiter.unblock(phone.replace("whatsapp:", ""))
+    return {"unblocked": phone}
+
 @app.post("/webhook/test")
 async def test_chat(payload: WhatsAppPayload):
     response_text = await app.state.orchestrator.process_message(payload.user_id, payload.message)
     return {"response": response_text}
 
-MENU_DB = [
-    {"name": "Torta de Chocolate", "price": 20, "is_active": True},
-    {"name": "Cheesecake", "price": 25, "is_active": True},
-    {"name": "Desayuno Clásico", "price": 8, "is_active": True},
-    {"name": "Desayuno Especial", "price": 12, "is_active": True},
-    {"name": "Humita", "price": 1.50, "is_active": True},
-]
-
 # ---------------------------------------------------------
 # ADMIN DASHBOARD ROUTES
 # ---------------------------------------------------------
 
 @app.get("/admin/orders", response_class=HTMLResponse)
-def read_orders(request: Request):
-    # Use the connection from the request state or create a new session if safer
-    db = SessionLocal()
-    try:
-        orders = db.query(Order).order_by(Order.created_at.desc()).limit(20).all()
-        return templates.TemplateResponse("dashboard.html", {"request": request, "orders": orders})
-    finally:
-        db.close()
+def read_orders(request: Request, tenant: str = None):
+    shop = tenant_registry.get(tenant)  # Unknown / missing id = default shop
+    # Only the first load queries Postgres; afterwards save_order keeps the snapshot fresh
+    if not dashboard_publisher.is_primed(shop.id):
+        db = SessionLocal()
+        try:
+            orders = (
+                db.query(Order)
+                .filter(Order.tenant_id == shop.id)
+                .order_by(Order.created_at.desc())
+                .limit(20)
+                .all()
+            )
+            dashboard_publisher.prime(shop.id, orders)
+        finally:
+            db.close()
+    return templates.TemplateResponse("dashboard.html", {
+        "request": request,
+        "tenant": shop,
+        "orders": dashboard_publisher.recent_orders(shop.id),
+    })
+
+@app.get("/admin/orders/stream")
+async def stream_orders(tenant: str = None):
+    """Server-Sent Events: one shop's new orders + menu availability changes."""
+    return StreamingResponse(
+        dashboard_publisher.stream(tenant_registry.get(tenant).id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/admin/menu", response_class=HTMLResponse)
 async def admin_menu(request: Request):
@@ -116,6 +236,7 @@ async def toggle_product(product_name: str = Form(...)):
         if product["name"] == product_name:
             product["is_active"] = not product["is_active"] # FLIP TRUE/FALSE
             print(f"✅ New status for {product_name}: {product['is_active']}")
+            dashboard_publisher.publish_menu(product)
             break
     
     # 2. Redirect back to menu to see the change
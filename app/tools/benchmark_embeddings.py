@@ -0,0 +1,195 @@
+"""
+Embedding backend benchmark: PyTorch MiniLM (huggingface) vs int8 ONNX Runtime (onnx).
+
+Each backend runs in its own subprocess so memory numbers aren't polluted by the
+other one. Reported per backend: model load time, RSS after load and peak RSS,
+single-query latency (p50/p95), batch throughput on the menu chunks. Across
+backends: retrieval agreement on MENU_QUERIES (top-1 match and top-k overlap
+of the FAISS results, the same index OpenAIService builds).
+
+Usage:
+    python -m app.tools.benchmark_embeddings
+    python -m app.tools.benchmark_embeddings --backends huggingface,onnx --k 3 --runs 5 --json-out bench.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+# Settings are required at import time; the benchmark never uses these connections.
+os.environ.setdefault("DEEPSEEK_API_KEY", "benchmark")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:0/0")
+
+# Typical RAG questions (menu_query / price_query / order_intent traffic)
+MENU_QUERIES = [
+    "cuánto cuesta la torta mocca",
+    "precio de la margarita de vainilla para 10 personas",
+    "tienen torta de chocolate",
+    "qué bocaditos de sal tienen",
+    "empanadas de verde con pollo",
+    "cuánto está el ciento de bocaditos dulces",
+    "alfajores de chocolate",
+    "tienen algo vegetariano",
+    "mousse de maracuyá",
+    "pie de limón",
+    "a qué hora abren el sábado",
+    "dónde queda el local",
+    "selva negra para 20 personas",
+    "quiero una torta para un cumpleaños de 15 personas",
+    "hacen entregas a domicilio",
+    "tartaletas de quiche",
+    "qué tortas tienen",
+    "pasión de chocolate precio",
+    "caracoles de jamón y queso",
+    "horario de atención domingo",
+]
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] if values else 0.0
+
+
+def run_backend(backend: str, menu_path: str, k: int, runs: int) -> dict:
+    """Worker: measures one backend in this process and returns its numbers."""
+    from langchain_community.vectorstores import FAISS
+    from app.infrastructure.embeddings import build_embeddings
+    from app.infrastructure.openai_service import split_menu
+
+    docs = split_menu(menu_path)
+    texts = [d.page_content for d in docs]
+    rss_before = _rss_mb()
+
+    start = time.perf_counter()
+    embeddings = build_embeddings(backend)
+    embeddings.embed_query("warmup")
+    load_s = time.perf_counter() - start
+    rss_loaded = _rss_mb()
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        embeddings.embed_documents(texts)
+    batch_s = (time.perf_counter() - start) / runs
+
+    latencies = []
+    for _ in range(runs):
+        for query in MENU_QUERIES:
+            t0 = time.perf_counter()
+            embeddings.embed_query(query)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    store = FAISS.from_documents(docs, embeddings)
+    top_k = {
+        query: [texts.index(d.page_content) for d in store.similarity_search(query, k=k)]
+        for query in MENU_QUERIES
+    }
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_s, 2),
+        "rss_before_load_mb": round(rss_before, 1),
+        "rss_after_load_mb": round(rss_loaded, 1),
+        "model_rss_mb": round(rss_loaded - rss_before, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "query_ms": {
+            "p50": round(statistics.median(latencies), 2),
+            "p95": round(_percentile(latencies, 0.95), 2),
+            "mean": round(statistics.mean(latencies), 2),
+        },
+        "chunks": len(texts),
+        "docs_per_second": round(len(texts) / batch_s, 1) if batch_s else 0.0,
+        "top_k": top_k,
+    }
+
+
+def agreement(baseline: dict, candidate: dict, k: int) -> dict:
+    top1 = overlap = 0
+    disagreements = []
+    for query, expected in baseline["top_k"].items():
+        got = candidate["top_k"][query]
+        top1 += bool(got and expected and got[0] == expected[0])
+        shared = len(set(got) & set(expected))
+        overlap += shared / k
+        if shared < k:
+            disagreements.append({"query": query, baseline["backend"]: expected, candidate["backend"]: got})
+    n = len(baseline["top_k"]) or 1
+    return {
+        "top1_agreement": round(top1 / n, 3),
+        f"overlap_at_{k}": round(overlap / n, 3),
+        "disagreements": disagreements,
+    }
+
+
+def print_report(results: list, comparisons: dict, k: int):
+    print(f"\n{'=' * 60}\n📊 EMBEDDING BENCHMARK\n{'=' * 60}")
+    for r in results:
+        print(f"\n[{r['backend']}]")
+        print(f"  Load:        {r['load_seconds']}s")
+        print(f"  RSS:         +{r['model_rss_mb']} MB for the model (peak {r['peak_rss_mb']} MB)")
+        print(f"  Query:       p50 {r['query_ms']['p50']} ms | p95 {r['query_ms']['p95']} ms")
+        print(f"  Throughput:  {r['docs_per_second']} chunks/s ({r['chunks']} menu chunks)")
+    for name, c in comparisons.items():
+        print(f"\n[{name}]")
+        print(f"  Top-1 agreement: {c['top1_agreement'] * 100:.1f}%")
+        print(f"  Overlap@{k}:       {c[f'overlap_at_{k}'] * 100:.1f}%")
+        for d in c["disagreements"]:
+            print(f"  ≠ {d}")
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on the menu RAG workload.")
+    parser.add_argument("--backends", default="huggingface,onnx", help="Comma-separated; the first is the baseline")
+    parser.add_argument("--menu", default="data/menu.md")
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per query")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions for latency/throughput")
+    parser.add_argument("--json-out", help="Write the full report as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)  # Internal: run one backend, print JSON
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.menu, args.k, args.runs)))
+        return
+
+    results = []
+    for backend in args.backends.split(","):
+        print(f"⏳ Benchmarking {backend}...")
+        proc = subprocess.run(
+            [sys.executable, "-m", "app.tools.benchmark_embeddings", "--worker", backend,
+             "--menu", args.menu, "--k", str(args.k), "--runs", str(args.runs)],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"❌ {backend} failed:\n{proc.stderr[-2000:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    comparisons = {
+        f"{results[0]['backend']} vs {r['backend']}": agreement(results[0], r, args.k)
+        for r in results[1:]
+    }
+    print_report(results, comparisons, args.k)
+    print(f"\n(ONNX model dir: {settings.ONNX_EMBEDDING_MODEL_DIR})")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "comparisons": comparisons}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Report written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Rolling summary vs raw history window: prompt tokens and extraction accuracy.
+
+Runs scripted multi-turn conversations (details given early, referenced later)
+through the Orchestrator with the real LLM, once with CONVERSATION_SUMMARY_ENABLED
+off (raw 6-message window) and once on (summary + cart facts + last messages),
+and scores the final cart / delivery / dedication against the expected values.
+State lives in RAM; orders and notifications go to in-memory stand-ins.
+Costs real DeepSeek calls (DEEPSEEK_API_KEY from .env).
+
+Usage:
+    python -m app.tools.eval_conversation_memory
+    python -m app.tools.eval_conversation_memory --repeat 3 --json-out memory_eval.json
+"""
+import argparse
+import asyncio
+import json
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:0/0")
+
+from app.infrastructure.state_manager import state_manager
+from app.infrastructure.rule_engine import normalize
+from app.infrastructure.openai_service import OpenAIService
+from app.application.orchestrator import Orchestrator
+from app.tools.replay_traffic import ReplayOrderRepository, NullNotifier
+
+SCENARIOS = [
+    {
+        "name": "address_given_early",
+        "messages": [
+            "Hola buenas", "Quisiera una Torta Mocca para 20 personas",
+            "es para entregar en la Av. Amazonas N34-12 y Naciones Unidas", "¿la torta lleva café?",
+            "ok perfecto", "y también 50 empanadas de verde con pollo", "eso es todo", "sí",
+            "a domicilio, a la dirección que le di",
+        ],
+        "expect": {"items": {"torta mocca": 1, "empanadas de verde": 50}, "method": "delivery", "address": "amazonas"},
+    },
+    {
+        "name": "late_quantity_fix",
+        "messages": [
+            "Buenas tardes", "quiero 2 Cheesecake", "y un Pie de limón", "¿hacen entregas los domingos?",
+            "ok", "¿tienen mousse de maracuyá?", "bueno no, del cheesecake mejor que sea solo uno", "listo",
+        ],
+        "expect": {"items": {"cheesecake": 1, "pie de limon": 1}},
+    },
+    {
+        "name": "dedication_given_early",
+        "messages": [
+            "Hola", "necesito una Torta Selva Negra para 15 personas para el sábado",
+            "que diga 'Feliz cumpleaños Mami'", "¿cuánto cuesta?", "ok", "¿a qué hora abren el sábado?",
+            "paso a retirar", "listo",
+        ],
+        "expect": {"items": {"selva negra": 1}, "method": "pickup", "dedication": "mami"},
+    },
+    {
+        "name": "remove_after_window",
+        "messages": [
+            "Hola veci", "quiero 30 empanadas de morocho con carne y 20 caracoles de jamón y queso",
+            "¿los caracoles son grandes?", "ah ok", "¿y qué otros bocaditos de sal tienen?",
+            "mejor quite las empanadas", "a domicilio a la Calle Cuenca 123", "listo",
+        ],
+        "expect": {"items": {"caracoles de jamon": 20}, "method": "delivery", "address": "cuenca"},
+    },
+]
+
+
+def score(expect: dict, context: dict) -> dict:
+    """Field-level correctness of the final cart against the scenario's expectation."""
+    items = context.get("items", [])
+    delivery = context.get("delivery_info") or {}
+    modifiers = context.get("modifiers") or {}
+    checks = {}
+
+    found = {}
+    for item in items:
+        name = normalize(item.get("product", ""))
+        key = next((k for k in expect["items"] if normalize(k) in name), name)
+        found[key] = found.get(key, 0) + int(item.get("quantity") or 1)
+    checks["items"] = found == expect["items"]
+
+    if "method" in expect:
+        checks["method"] = delivery.get("method") == expect["method"]
+    if "address" in expect:
+        checks["address"] = expect["address"] in normalize(delivery.get("address") or "")
+    if "dedication" in expect:
+        checks["dedication"] = expect["dedication"] in normalize(str(modifiers.get("dedication") or ""))
+    return checks
+
+
+async def run_mode(summary_enabled: bool, repeat: int) -> dict:
+    state_manager.redis_available = False
+    state_manager._memory_store.clear()
+
+    orchestrator = Orchestrator(
+        ai_service=OpenAIService(),
+        order_repo=ReplayOrderRepository(),
+        notifier=NullNotifier()
+    )
+    orchestrator.typing_delay = None
+    orchestrator.load_shedder.off_hours_enabled = False
+    orchestrator.memory.enabled = summary_enabled
+    mode = "summary" if summary_enabled else "raw_window"
+
+    results = []
+    for run in range(repeat):
+        for scenario in SCENARIOS:
+            user_id = f"+eval-{mode}-{run}-{scenario['name']}"
+            last_context = {}
+            for message in scenario["messages"]:
+                await orchestrator.process_message(user_id, message)
+                await orchestrator.memory.drain()
+                context = state_manager.get_context(user_id)
+                if context.get("items"):
+                    last_context = context  # Survives the session reset after a confirmed order
+            checks = score(scenario["expect"], last_context)
+            results.append({"scenario": scenario["name"], "run": run, "checks": checks,
+                            "correct": all(checks.values()), "final_context": last_context})
+            print(f"{'✅' if all(checks.values()) else '❌'} [{mode}] {scenario['name']} {checks}")
+
+    fields = [ok for r in results for ok in r["checks"].values()]
+    return {
+        "mode": mode,
+        "scenario_accuracy": round(sum(r["correct"] for r in results) / len(results), 3),
+        "field_accuracy": round(sum(fields) / len(fields), 3),
+        # Every call that took a scheduler slot, background summaries included
+        # (the load shedder doesn't track those, so its counter would flatter summary mode)
+        "llm_calls": sum(s["calls"] for s in orchestrator.llm_scheduler.snapshot()["stages"].values()),
+        "summary_calls": orchestrator.memory.stats["summary_calls"] + orchestrator.memory.stats["summary_errors"],
+        "turns": sum(len(s["messages"]) for s in SCENARIOS) * repeat,
+        "tokens": orchestrator.memory.snapshot(),
+        "results": results,
+    }
+
+
+def print_report(reports: list):
+    print(f"\n{'=' * 60}\n🧠 CONVERSATION MEMORY EVAL\n{'=' * 60}")
+    for r in reports:
+        t = r["tokens"]
+        history_tokens = t["avg_prompt_history_tokens"] if t["enabled"] else t["avg_raw_window_tokens"]
+        print(f"\n[{r['mode']}]")
+        print(f"  Scenario accuracy:      {r['scenario_accuracy'] * 100:.1f}%")
+        print(f"  Field accuracy:         {r['field_accuracy'] * 100:.1f}%")
+        print(f"  LLM calls / turn:       {r['llm_calls'] / r['turns']:.2f} ({r['summary_calls']} summaries)")
+        print(f"  History tokens/prompt:  {history_tokens} (+{t['summary_tokens_per_prompt']} summary upkeep)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rolling summary vs raw history window.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario (LLM output varies)")
+    parser.add_argument("--json-out", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    reports = [asyncio.run(run_mode(enabled, args.repeat)) for enabled in (False, True)]
+    print_report(reports)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2, default=str)
+        print(f"💾 Report written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
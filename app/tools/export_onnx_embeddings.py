@@ -0,0 +1,68 @@
+"""
+Exports all-MiniLM-L6-v2 to ONNX and quantizes it to int8 for EMBEDDING_BACKEND=onnx.
+
+Needs the PyTorch stack (requirements-onnx-export.txt) on the machine running the export
+only; the resulting folder is all the production image needs (requirements-onnx.txt).
+`docker build --build-arg EMBEDDING_BACKEND=onnx .` runs it in a throwaway build stage.
+
+Usage:
+    pip install -r requirements-onnx-export.txt --extra-index-url https://download.pytorch.org/whl/cpu
+    python -m app.tools.export_onnx_embeddings
+    python -m app.tools.export_onnx_embeddings --out data/models/all-MiniLM-L6-v2-onnx --no-quantize
+"""
+import argparse
+import os
+
+# Settings are required at import time; the export never uses these connections.
+os.environ.setdefault("DEEPSEEK_API_KEY", "export")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:0/0")
+
+from app.core.config import settings
+
+MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def export(out_dir: str, quantize: bool = True, opset: int = 14):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+    model = AutoModel.from_pretrained(MODEL_ID).eval()
+    tokenizer.save_pretrained(out_dir)  # Writes tokenizer.json (fast tokenizer)
+
+    sample = tokenizer(["hola veci, cuánto cuesta la torta mocca?"], return_tensors="pt")
+    onnx_path = os.path.join(out_dir, "model.onnx")
+    dynamic = {0: "batch", 1: "tokens"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            onnx_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic,
+                          "token_type_ids": dynamic, "last_hidden_state": dynamic},
+            opset_version=opset,
+        )
+    print(f"✅ Exported {MODEL_ID} -> {onnx_path} ({os.path.getsize(onnx_path) / 1e6:.1f} MB)")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = os.path.join(out_dir, "model_quantized.onnx")
+        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized (int8) -> {quantized_path} ({os.path.getsize(quantized_path) / 1e6:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export MiniLM embeddings to (int8) ONNX.")
+    parser.add_argument("--out", default=settings.ONNX_EMBEDDING_MODEL_DIR, help="Output folder")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep fp32 weights only")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+    export(args.out, quantize=not args.no_quantize, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
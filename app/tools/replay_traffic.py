@@ -0,0 +1,235 @@
+"""
+Accelerated conversation replay.
+
+Drives a recording made by TrafficRecorder back through the Orchestrator at N x speed.
+LLM outputs are served from the recording (no DeepSeek calls), state lives in RAM
+(never touches the production Redis), and orders/notifications go to in-memory stand-ins.
+
+Usage:
+    python -m app.tools.replay_traffic data/traffic.jsonl.gz --speed 20
+    python -m app.tools.replay_traffic data/traffic.jsonl.gz --speed 0 --json-out report.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import statistics
+import time
+
+# Settings are required at import time; replay never uses these connections.
+os.environ.setdefault("DEEPSEEK_API_KEY", "replay")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:0/0")
+
+from app.interfaces.IAiService import IAiService
+from app.interfaces.IOrderRepository import IOrderRepository
+from app.infrastructure.state_manager import state_manager
+from app.infrastructure.traffic_recorder import load_recording
+from app.infrastructure.tenant_registry import tenant_registry
+from app.domain.tenant import DEFAULT_TENANT_ID
+from app.application.orchestrator import Orchestrator
+
+# Recorded LLM calls still available for the turn being replayed
+_replay_turn = contextvars.ContextVar("replay_turn", default=None)
+
+FALLBACK_OUTPUTS = {
+    "get_intent": "other",
+    "generate_response": "",
+    "extract_order_items": {"items": [], "modifiers": {}, "delivery_info": {}},
+}
+
+
+class ReplayTurn:
+    def __init__(self, record: dict):
+        self.record = record
+        self.pending_calls = list(record.get("llm_calls", []))
+        self.llm_divergences = []
+
+
+class ReplayAiService(IAiService):
+    """Local stand-in for the LLM: serves recorded outputs in call order."""
+
+    def __init__(self, latency_scale: float = 0.0):
+        self.latency_scale = latency_scale
+
+    async def get_intent(self, user_message: str, *args, **kwargs) -> str:
+        return await self._serve("get_intent", user_message)
+
+    async def generate_response(self, user_message: str, *args, **kwargs) -> str:
+        return await self._serve("generate_response", user_message)
+
+    async def extract_order_items(self, user_message: str, *args, **kwargs) -> dict:
+        return await self._serve("extract_order_items", user_message)
+
+    async def summarize_conversation(self, summary: str, *args, **kwargs) -> str:
+        return summary  # Summaries are background work and aren't recorded
+
+    async def _serve(self, method: str, user_message: str):
+        turn = _replay_turn.get()
+        if turn is None:
+            return FALLBACK_OUTPUTS[method]
+
+        for idx, call in enumerate(turn.pending_calls):
+            if call["method"] == method:
+                turn.pending_calls.pop(idx)
+                if call.get("input") != user_message:
+                    turn.llm_divergences.append(f"{method}: input changed")
+                if self.latency_scale:
+                    await asyncio.sleep(call.get("latency_ms", 0) / 1000 * self.latency_scale)
+                return call["output"]
+
+        turn.llm_divergences.append(f"{method}: not in recording")
+        return FALLBACK_OUTPUTS[method]
+
+
+class ReplayOrderRepository(IOrderRepository):
+    def __init__(self):
+        self.orders = []
+
+    def save_order(self, user_phone, items, total_price="Pending", tenant_id=DEFAULT_TENANT_ID) -> bool:
+        self.orders.append({"tenant_id": tenant_id, "user_phone": user_phone, "items": items})
+        return True
+
+    def get_recent_orders(self, user_phone, tenant_id=DEFAULT_TENANT_ID, limit=3) -> list:
+        mine = [o for o in self.orders if o["user_phone"] == user_phone and o["tenant_id"] == tenant_id]
+        return list(reversed(mine))[:limit]
+
+
+class NullNotifier:
+    def notify_admin_new_order(self, user_phone, items, admin_phone=None):
+        pass
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "p50": round(pick(0.50), 1),
+        "p95": round(pick(0.95), 1),
+        "p99": round(pick(0.99), 1),
+        "max": round(ordered[-1], 1),
+        "mean": round(statistics.fmean(ordered), 1),
+    }
+
+
+async def replay(records: list, speed: float, latency_scale: float) -> dict:
+    # Isolate state: RAM only, starting empty
+    state_manager.redis_available = False
+    state_manager._memory_store.clear()
+
+    orchestrator = Orchestrator(
+        ai_service=ReplayAiService(latency_scale),
+        order_repo=ReplayOrderRepository(),
+        notifier=NullNotifier()
+    )
+    orchestrator.typing_delay = None
+    # Replay runs at a different wall-clock time than the recording
+    orchestrator.load_shedder.off_hours_enabled = False
+
+    results = []
+    session_tails = {}  # (tenant, user) -> last task (turns of one conversation stay sequential)
+    t0_recorded = records[0]["ts"] if records else 0
+    t0_replay = time.monotonic()
+
+    async def run_turn(record, previous):
+        if previous:
+            await previous
+        turn = ReplayTurn(record)
+        token = _replay_turn.set(turn)
+        tenant = tenant_registry.get(record.get("tenant_id"))
+        state_key = tenant.session_key(record["user_id"])
+        state_before = state_manager.get_state(state_key)
+        start = time.perf_counter()
+        try:
+            response = await orchestrator.process_message(record["user_id"], record["message"], tenant=tenant)
+        finally:
+            _replay_turn.reset(token)
+        latency_ms = (time.perf_counter() - start) * 1000
+        results.append({
+            "record": record,
+            "response": response,
+            "state_before": state_before,
+            "state_after": state_manager.get_state(state_key),
+            "latency_ms": latency_ms,
+            "llm_divergences": turn.llm_divergences + [
+                f"{c['method']}: recorded but not called" for c in turn.pending_calls
+            ],
+        })
+
+    for record in records:
+        if speed > 0:
+            delay = (record["ts"] - t0_recorded) / speed - (time.monotonic() - t0_replay)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        session = (record.get("tenant_id"), record["user_id"])
+        session_tails[session] = asyncio.create_task(run_turn(record, session_tails.get(session)))
+
+    await asyncio.gather(*session_tails.values())
+    return build_report(results)
+
+
+def build_report(results: list) -> dict:
+    reply_diffs, state_diffs, llm_diffs = [], [], []
+    for r in results:
+        rec = r["record"]
+        where = f"{rec['user_id']} @ {rec['ts']:.0f}: {rec['message'][:40]!r}"
+        if r["response"] != rec.get("response"):
+            reply_diffs.append({"turn": where, "recorded": rec.get("response"), "replayed": r["response"]})
+        recorded_transition = (rec.get("state_before"), rec.get("state_after"))
+        replayed_transition = (r["state_before"], r["state_after"])
+        if recorded_transition != replayed_transition:
+            state_diffs.append({"turn": where, "recorded": recorded_transition, "replayed": replayed_transition})
+        if r["llm_divergences"]:
+            llm_diffs.append({"turn": where, "details": r["llm_divergences"]})
+
+    return {
+        "turns": len(results),
+        "reply_divergences": reply_diffs,
+        "state_divergences": state_diffs,
+        "llm_call_divergences": llm_diffs,
+        "latency_ms": {
+            "recorded": percentiles([r["record"].get("latency_ms", 0) for r in results]),
+            "replayed": percentiles([r["latency_ms"] for r in results]),
+        },
+    }
+
+
+def print_report(report: dict, max_examples: int = 10):
+    print(f"\n📼 Replayed {report['turns']} turns")
+    for title, key in [("Reply divergences", "reply_divergences"),
+                       ("State transition divergences", "state_divergences"),
+                       ("LLM call divergences", "llm_call_divergences")]:
+        items = report[key]
+        print(f"\n{'⚠️' if items else '✅'} {title}: {len(items)}")
+        for item in items[:max_examples]:
+            print(f"   - {json.dumps(item, ensure_ascii=False)}")
+    print("\n⏱️ Latency (ms)")
+    for label, stats in report["latency_ms"].items():
+        print(f"   {label:>9}: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded webhook traffic through the Orchestrator.")
+    parser.add_argument("recording", help="Path to a TrafficRecorder .jsonl(.gz) file")
+    parser.add_argument("--speed", type=float, default=10.0, help="Time compression factor (0 = as fast as possible)")
+    parser.add_argument("--llm-latency-scale", type=float, default=0.0,
+                        help="Sleep recorded LLM latency x this factor (0 = instant stand-in)")
+    parser.add_argument("--json-out", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    records = load_recording(args.recording)
+    report = asyncio.run(replay(records, args.speed, args.llm_latency_scale))
+    print_report(report)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Report written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
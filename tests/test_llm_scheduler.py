@@ -0,0 +1,51 @@
+import asyncio
+
+from app.application.llm_scheduler import PriorityLLMScheduler
+
+PRIORITIES = {"checkout": 0, "greeting": 3}
+
+
+def test_release_skips_waiter_cancelled_in_same_tick():
+    async def scenario():
+        scheduler = PriorityLLMScheduler(max_concurrency=1, aging_seconds=0, priorities=PRIORITIES)
+        served = []
+
+        async def waiter(stage):
+            async with scheduler.slot(stage):
+                served.append(stage)
+
+        holder = scheduler.slot("greeting")
+        await holder.__aenter__()
+        cancelled_task = asyncio.create_task(waiter("checkout"))  # Best priority: picked first
+        other_task = asyncio.create_task(waiter("greeting"))
+        await asyncio.sleep(0)
+        assert len(scheduler._waiting) == 2
+
+        # Cancel the queued waiter and release the slot in the same tick (its except hasn't run)
+        cancelled_task.cancel()
+        await holder.__aexit__(None, None, None)
+
+        await asyncio.wait_for(other_task, timeout=1)
+        assert served == ["greeting"]
+        assert cancelled_task.cancelled()
+        assert scheduler._running == 0
+        assert scheduler._waiting == []
+
+    asyncio.run(scenario())
+
+
+def test_slot_is_reused_after_release():
+    async def scenario():
+        scheduler = PriorityLLMScheduler(max_concurrency=1, aging_seconds=0, priorities=PRIORITIES)
+        order = []
+
+        async def call(stage):
+            async with scheduler.slot(stage):
+                order.append(stage)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(call("greeting"), call("greeting"), call("checkout"))
+        assert order == ["greeting", "checkout", "greeting"]
+        assert scheduler._running == 0
+
+    asyncio.run(scenario())